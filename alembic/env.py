@@ -34,6 +34,14 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Full-text search objects created by raw DDL, see `app.models.post`
+SEARCH_OBJECTS = {'search_vector', 'ix_post_search_vector'}
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """Hides the search objects from autogenerate and `alembic check`."""
+    return not (name.startswith('post_fts') or name in SEARCH_OBJECTS)
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -51,6 +59,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -63,6 +72,7 @@ def do_run_migrations(connection: Connection) -> None:
     context.configure(
         connection=connection,
         target_metadata=target_metadata,
+        include_object=include_object,
         render_as_batch=True,
     )
 
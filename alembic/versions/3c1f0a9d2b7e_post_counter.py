@@ -0,0 +1,38 @@
+"""Post counter shards
+
+Revision ID: 3c1f0a9d2b7e
+Revises: 75965a6c7155
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3c1f0a9d2b7e'
+down_revision = '75965a6c7155'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('post_counter',
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('likes', sa.Integer(), nullable=False),
+    sa.Column('dislikes', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], name=op.f('fk_post_counter_post_id_post'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_post_counter')),
+    sa.UniqueConstraint('post_id', 'shard', name=op.f('uq_post_counter_post_id'))
+    )
+    with op.batch_alter_table('post_counter', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_post_counter_id'), ['id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('post_counter', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_post_counter_id'))
+
+    op.drop_table('post_counter')
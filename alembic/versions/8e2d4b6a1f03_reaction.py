@@ -0,0 +1,38 @@
+"""Reactions of users to posts
+
+Revision ID: 8e2d4b6a1f03
+Revises: 3c1f0a9d2b7e
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8e2d4b6a1f03'
+down_revision = '3c1f0a9d2b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('reaction',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('is_like', sa.Boolean(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], name=op.f('fk_reaction_post_id_post'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name=op.f('fk_reaction_user_id_user'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_reaction')),
+    sa.UniqueConstraint('user_id', 'post_id', name=op.f('uq_reaction_user_id'))
+    )
+    with op.batch_alter_table('reaction', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_reaction_id'), ['id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reaction', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reaction_id'))
+
+    op.drop_table('reaction')
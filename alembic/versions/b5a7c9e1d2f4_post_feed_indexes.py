@@ -0,0 +1,28 @@
+"""Post feed indexes
+
+Revision ID: b5a7c9e1d2f4
+Revises: 8e2d4b6a1f03
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b5a7c9e1d2f4'
+down_revision = '8e2d4b6a1f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.create_index('ix_post_author_id_created_id', ['author_id', sa.text('created DESC'), 'id'], unique=False)
+        batch_op.create_index('ix_post_created_id', [sa.text('created DESC'), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_created_id')
+        batch_op.drop_index('ix_post_author_id_created_id')
@@ -0,0 +1,62 @@
+"""Post full-text search
+
+Revision ID: c7e3f1a9b2d6
+Revises: b5a7c9e1d2f4
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c7e3f1a9b2d6'
+down_revision = 'b5a7c9e1d2f4'
+branch_labels = None
+depends_on = None
+
+UPGRADE = {
+    'sqlite': (
+        "CREATE VIRTUAL TABLE post_fts USING fts5("
+        "title, content, content='post', content_rowid='id')",
+        "INSERT INTO post_fts(post_fts) VALUES ('rebuild')",
+        "CREATE TRIGGER post_fts_insert AFTER INSERT ON post "
+        "BEGIN INSERT INTO post_fts(rowid, title, content) "
+        "VALUES (new.id, new.title, new.content); END",
+        "CREATE TRIGGER post_fts_delete AFTER DELETE ON post "
+        "BEGIN INSERT INTO post_fts(post_fts, rowid, title, content) "
+        "VALUES ('delete', old.id, old.title, old.content); END",
+        "CREATE TRIGGER post_fts_update AFTER UPDATE OF title, content ON post "
+        "BEGIN INSERT INTO post_fts(post_fts, rowid, title, content) "
+        "VALUES ('delete', old.id, old.title, old.content); "
+        "INSERT INTO post_fts(rowid, title, content) "
+        "VALUES (new.id, new.title, new.content); END",
+    ),
+    'postgresql': (
+        "ALTER TABLE post ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', title), 'A') || "
+        "setweight(to_tsvector('simple', content), 'B')) STORED",
+        "CREATE INDEX ix_post_search_vector ON post USING gin (search_vector)",
+    ),
+}
+DOWNGRADE = {
+    'sqlite': (
+        "DROP TRIGGER post_fts_update",
+        "DROP TRIGGER post_fts_delete",
+        "DROP TRIGGER post_fts_insert",
+        "DROP TABLE post_fts",
+    ),
+    'postgresql': (
+        "DROP INDEX ix_post_search_vector",
+        "ALTER TABLE post DROP COLUMN search_vector",
+    ),
+}
+
+
+def upgrade() -> None:
+    for statement in UPGRADE.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in DOWNGRADE.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
@@ -0,0 +1,37 @@
+"""Post rating and hot score
+
+Revision ID: d4f6a8c0e2b1
+Revises: c7e3f1a9b2d6
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd4f6a8c0e2b1'
+down_revision = 'c7e3f1a9b2d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Plain ALTER TABLE: recreating `post` would drop the FTS triggers.
+    op.add_column('post', sa.Column(
+        'rating', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('post', sa.Column(
+        'hot', sa.Float(), server_default='0', nullable=False))
+    op.execute('UPDATE post SET rating = '
+               'coalesce(likes, 0) - coalesce(dislikes, 0)')
+    op.create_index('ix_post_rating_id', 'post',
+                    [sa.text('rating DESC'), 'id'], unique=False)
+    op.create_index('ix_post_hot_id', 'post',
+                    [sa.text('hot DESC'), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_post_hot_id', table_name='post')
+    op.drop_index('ix_post_rating_id', table_name='post')
+    op.drop_column('post', 'hot')
+    op.drop_column('post', 'rating')
@@ -0,0 +1,39 @@
+"""Follows of users
+
+Revision ID: e5b7d9f1a3c2
+Revises: d4f6a8c0e2b1
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e5b7d9f1a3c2'
+down_revision = 'd4f6a8c0e2b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('follow',
+    sa.Column('follower_id', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['user.id'], name=op.f('fk_follow_author_id_user'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['follower_id'], ['user.id'], name=op.f('fk_follow_follower_id_user'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_follow')),
+    sa.UniqueConstraint('follower_id', 'author_id', name=op.f('uq_follow_follower_id'))
+    )
+    with op.batch_alter_table('follow', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_follow_id'), ['id'], unique=False)
+        batch_op.create_index('ix_follow_author_id_follower_id', ['author_id', 'follower_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('follow', schema=None) as batch_op:
+        batch_op.drop_index('ix_follow_author_id_follower_id')
+        batch_op.drop_index(batch_op.f('ix_follow_id'))
+
+    op.drop_table('follow')
@@ -0,0 +1,27 @@
+"""Followers count of users
+
+Revision ID: f6c8e0a2b4d3
+Revises: e5b7d9f1a3c2
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f6c8e0a2b4d3'
+down_revision = 'e5b7d9f1a3c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column(
+        'followers', sa.Integer(), server_default='0', nullable=False))
+    op.execute('UPDATE "user" SET followers = (SELECT count(*) FROM follow '
+               'WHERE follow.author_id = "user".id)')
+
+
+def downgrade() -> None:
+    op.drop_column('user', 'followers')
@@ -0,0 +1,33 @@
+"""Conditional GET of the public read endpoints."""
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+from app.core import settings
+
+
+def is_conditional(request: Request) -> bool:
+    return 'if-none-match' in request.headers
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """`If-None-Match` uses the weak comparison, so `W/` is ignored."""
+    header = request.headers.get('if-none-match')
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in (tag.removeprefix('W/') for tag in tags)
+
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    """The responses are the same for every user, so shared caches
+       may keep them for `http_cache_max_age` seconds."""
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = (
+        f'public, max-age={settings.http_cache_max_age}')
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=HTTPStatus.NOT_MODIFIED)
+    set_cache_headers(response, etag)
+    return response
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import schemas
+from app.api.endpoints.post import posts_response
+from app.api.pagination import Pagination
+from app.core import current_user, get_async_session, settings
+from app.core.replica import current_writer, get_read_session
+from app.crud.follow import follow_crud
+from app.crud.post import post_crud
+from app.models import User
+
+router = APIRouter(tags=['Feed'])
+
+SUM_FOLLOW = 'Подписаться на посты пользователя.'
+SUM_UNFOLLOW = 'Отписаться от постов пользователя.'
+SUM_FEED = ('Возвращает ленту: последние посты пользователей, '
+            'на которых подписан выполняющий запрос пользователь.')
+FEED_AUTHORS = (
+    f'В ленту попадают посты не больше {settings.feed_max_authors} '
+    'авторов, на которых пользователь подписался последними, '
+    'на всех страницах.')
+
+
+@router.post(
+    '/follow/{author_id}',
+    response_model=schemas.UserRead,
+    summary=SUM_FOLLOW,
+    description=(f'{settings.AUTH_ONLY} {SUM_FOLLOW}'))
+async def follow(
+    author_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_writer),
+):
+    return await follow_crud.follow(session, author_id, user)
+
+
+@router.delete(
+    '/follow/{author_id}',
+    response_model=schemas.UserRead,
+    summary=SUM_UNFOLLOW,
+    description=(f'{settings.AUTH_ONLY} {SUM_UNFOLLOW}'))
+async def unfollow(
+    author_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_writer),
+):
+    return await follow_crud.unfollow(session, author_id, user)
+
+
+@router.get(
+    '/feed',
+    response_model=list[schemas.PostResponse],
+    response_model_exclude_none=True,
+    summary=SUM_FEED,
+    description=(f'{settings.AUTH_ONLY} {SUM_FEED} {FEED_AUTHORS}'))
+async def get_feed(
+    pagination: Pagination = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_user),
+):
+    return posts_response(await post_crud.get_timeline(
+        session, user, limit=pagination.limit, cursor=pagination.cursor),
+        pagination, post_crud.next_feed_cursor)
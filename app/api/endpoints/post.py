@@ -1,10 +1,22 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime as dt
+from enum import Enum
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
-from app.core import current_user, get_async_session, settings
+from app.api import conditional, ndjson
+from app.api.pagination import Pagination
+from app.core import (current_superuser, current_user, get_async_session,
+                      settings)
+from app.core.replica import current_writer, get_read_session
 from app.crud.post import post_crud
 from app.models import User
+from app.serializers.post import (dumps_post, dumps_posts, dumps_posts_csv,
+                                  dumps_posts_ndjson)
 
 router = APIRouter(prefix='/post', tags=['Posts'])
 
@@ -17,6 +29,47 @@ SUM_UPDATE_POST = 'Редактирование поста.'
 SUM_DELETE_POST = 'Удаление поста.'
 SUM_LIKE_POST = 'Поставить LIKE посту.'
 SUM_DISLIKE_POST = 'Поставить DISLIKE посту.'
+SUM_SEARCH_POSTS = ('Полнотекстовый поиск по заголовку и тексту постов, '
+                    'сначала наиболее релевантные.')
+SUM_TOP_POSTS = ('Возвращает лучшие посты: по рейтингу (LIKE - DISLIKE) '
+                 'или по рейтингу с учетом давности (hot).')
+SUM_EXPORT_POSTS = ('Выгрузка постов в формате NDJSON или CSV, '
+                    'от новых к старым.')
+SUM_IMPORT_POSTS = ('Импорт постов из NDJSON: '
+                    'по одному JSON-объекту поста в строке.')
+
+
+class TopOrder(str, Enum):
+    HOT = 'hot'
+    RATING = 'rating'
+
+
+class ExportFormat(str, Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+def posts_response(
+    posts: list[Row],
+    pagination: Pagination,
+    next_cursor=post_crud.next_cursor,
+    request: Request | None = None,
+) -> Response:
+    """With `request` the page is public: it gets the cache headers
+       and is not sent again if the client has the same version."""
+    if request is None:
+        response = Response(
+            dumps_posts(posts), media_type=JSONResponse.media_type)
+    else:
+        etag = post_crud.etag(*posts)
+        if conditional.etag_matches(request, etag):
+            response = conditional.not_modified(etag)
+        else:
+            response = Response(
+                dumps_posts(posts), media_type=JSONResponse.media_type)
+            conditional.set_cache_headers(response, etag)
+    pagination.set_next_cursor(response, next_cursor(posts, pagination.limit))
+    return response
 
 
 @router.get(
@@ -25,8 +78,39 @@ SUM_DISLIKE_POST = 'Поставить DISLIKE посту.'
     response_model_exclude_none=True,
     summary=SUM_ALL_POSTS,
     description=(f'{settings.ALL_USERS} {SUM_ALL_POSTS}'))
-async def get_all_posts(session: AsyncSession = Depends(get_async_session)):
-    return await post_crud.get_all(session)
+async def get_all_posts(
+    request: Request,
+    pagination: Pagination = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    if conditional.is_conditional(request):
+        # The versions of the page are enough to answer 304.
+        versions = await post_crud.get_versions(
+            session, limit=pagination.limit, cursor=pagination.cursor)
+        if conditional.etag_matches(request, post_crud.etag(*versions)):
+            return posts_response(versions, pagination, request=request)
+    return posts_response(await post_crud.get_all(
+        session, limit=pagination.limit, cursor=pagination.cursor,
+        projection=True), pagination, request=request)
+
+
+async def import_batch(
+    session: AsyncSession,
+    batch: list[tuple[int, schemas.PostCreate]],
+    user: User,
+    errors: list[schemas.PostImportError],
+) -> int:
+    """Saves the batch of numbered lines, returns the number of created."""
+    if not batch:
+        return 0
+    lines, payloads = zip(*batch)
+    conflicts = await post_crud.bulk_create(session, payloads, user=user)
+    errors.extend(
+        schemas.PostImportError(
+            line=lines[index], detail=post_crud.OBJECT_ALREADY_EXISTS)
+        for index in conflicts)
+    batch.clear()
+    return len(payloads) - len(conflicts)
 
 
 @router.post(
@@ -38,11 +122,104 @@ async def get_all_posts(session: AsyncSession = Depends(get_async_session)):
 async def create_post(
     payload: schemas.PostCreate,
     session: AsyncSession = Depends(get_async_session),
-    user: User = Depends(current_user)
+    user: User = Depends(current_writer)
 ):
     return await post_crud.create(session, payload, user=user)
 
 
+@router.post(
+    '/import',
+    response_model=schemas.PostImportResult,
+    summary=SUM_IMPORT_POSTS,
+    description=(f'{settings.SUPER_ONLY} {SUM_IMPORT_POSTS}'),
+    openapi_extra={'requestBody': {'required': True, 'content': {
+        ndjson.MEDIA_TYPE: {'schema': {'type': 'string',
+                                       'format': 'binary'}}}}})
+async def import_posts(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_superuser),
+):
+    created, errors, batch = 0, [], []
+    async for line, data in ndjson.read_lines(request.stream()):
+        try:
+            batch.append((line, schemas.PostCreate.parse_raw(data)))
+        except ValidationError as error:
+            errors.append(schemas.PostImportError(
+                line=line, detail=error.errors()[0]['msg']))
+        if len(batch) == settings.bulk_chunk_size:
+            created += await import_batch(session, batch, user, errors)
+    created += await import_batch(session, batch, user, errors)
+    return schemas.PostImportResult(
+        created=created, errors=sorted(errors, key=lambda error: error.line))
+
+
+@router.get(
+    '/search',
+    response_model=list[schemas.PostResponse],
+    response_model_exclude_none=True,
+    summary=SUM_SEARCH_POSTS,
+    description=(f'{settings.ALL_USERS} {SUM_SEARCH_POSTS}'))
+async def search_posts(
+    request: Request,
+    q: str = Query(min_length=1, max_length=200, description='Слова поиска.'),
+    pagination: Pagination = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    return posts_response(await post_crud.search(
+        session, q, limit=pagination.limit, cursor=pagination.cursor),
+        pagination, post_crud.next_rank_cursor, request)
+
+
+@router.get(
+    '/top',
+    response_model=list[schemas.PostResponse],
+    response_model_exclude_none=True,
+    summary=SUM_TOP_POSTS,
+    description=(f'{settings.ALL_USERS} {SUM_TOP_POSTS}'))
+async def get_top_posts(
+    request: Request,
+    order: TopOrder = TopOrder.HOT,
+    pagination: Pagination = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    return posts_response(await post_crud.get_top(
+        session, order.value, limit=pagination.limit,
+        cursor=pagination.cursor), pagination, post_crud.next_rank_cursor,
+        request)
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    summary=SUM_EXPORT_POSTS,
+    description=(f'{settings.SUPER_ONLY} {SUM_EXPORT_POSTS}'))
+async def export_posts(
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias='format'),
+    created_from: dt | None = Query(
+        None, description='Посты, созданные начиная с этого момента.'),
+    created_to: dt | None = Query(
+        None, description='Посты, созданные до этого момента.'),
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_superuser),
+):
+    if export_format is ExportFormat.CSV:
+        serializer, media_type = dumps_posts_csv, 'text/csv'
+    else:
+        serializer, media_type = dumps_posts_ndjson, ndjson.MEDIA_TYPE
+
+    async def content():
+        if export_format is ExportFormat.CSV:
+            yield dumps_posts_csv((), header=True)
+        async for rows in post_crud.stream_posts(
+                session, created_from, created_to):
+            yield serializer(rows)
+
+    return StreamingResponse(content(), media_type=media_type, headers={
+        'Content-Disposition':
+            f'attachment; filename="posts.{export_format.value}"'})
+
+
 @router.get(
     '/{post_id}',
     response_model=schemas.PostResponse,
@@ -51,9 +228,18 @@ async def create_post(
     description=(f'{settings.ALL_USERS} {SUM_POST}'))
 async def get_post(
     post_id: int,
-    session: AsyncSession = Depends(get_async_session),
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
 ):
-    return await post_crud.get_or_404(session, post_id)
+    if conditional.is_conditional(request):
+        etag = await post_crud.get_etag_or_404(session, post_id)
+        if conditional.etag_matches(request, etag):
+            return conditional.not_modified(etag)
+    data, etag = await post_crud.get_serialized_with_etag_or_404(
+        session, post_id, dumps_post, projection=True)
+    response = Response(data, media_type=JSONResponse.media_type)
+    conditional.set_cache_headers(response, etag)
+    return response
 
 
 @router.put(
@@ -66,7 +252,7 @@ async def update_post(
     post_id: int,
     payload: schemas.PostUpdate,
     session: AsyncSession = Depends(get_async_session),
-    user: User = Depends(current_user),
+    user: User = Depends(current_writer),
 ):
     return await post_crud.update(session, post_id, payload, user=user)
 
@@ -81,7 +267,7 @@ async def update_post(
 async def delete_post(
     post_id: int,
     session: AsyncSession = Depends(get_async_session),
-    user: User = Depends(current_user),
+    user: User = Depends(current_writer),
 ):
     return await post_crud.delete(session, post_id, user)
 
@@ -95,7 +281,7 @@ async def delete_post(
 async def like_post_(
     post_id: int,
     session: AsyncSession = Depends(get_async_session),
-    user: User = Depends(current_user),
+    user: User = Depends(current_writer),
 ):
     return await post_crud.like_dislike_post(session, post_id, user)
 
@@ -109,7 +295,7 @@ async def like_post_(
 async def dislike_post_(
     post_id: int,
     session: AsyncSession = Depends(get_async_session),
-    user: User = Depends(current_user),
+    user: User = Depends(current_writer),
 ):
     return await post_crud.like_dislike_post(session, post_id, user, False)
 
@@ -121,7 +307,10 @@ async def dislike_post_(
     summary=SUM_ALL_USER_POSTS,
     description=(f'{settings.AUTH_ONLY} {SUM_ALL_USER_POSTS}'))
 async def get_user_posts_(
-    session: AsyncSession = Depends(get_async_session),
+    pagination: Pagination = Depends(),
+    session: AsyncSession = Depends(get_read_session),
     user: User = Depends(current_user),
 ):
-    return await post_crud.get_user_posts(session, user)
+    return posts_response(await post_crud.get_user_posts(
+        session, user, limit=pagination.limit, cursor=pagination.cursor,
+        projection=True), pagination)
@@ -0,0 +1,20 @@
+"""Newline delimited JSON bodies."""
+from typing import AsyncIterable, AsyncIterator
+
+MEDIA_TYPE = 'application/x-ndjson'
+
+
+async def read_lines(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[tuple[int, bytes]]:
+    """Yields the numbered non-blank lines of the streamed body,
+       only the incomplete last line is kept in memory."""
+    number, tail = 0, b''
+    async for chunk in chunks:
+        *lines, tail = (tail + chunk).split(b'\n')
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if tail.strip():
+        yield number + 1, tail
@@ -0,0 +1,27 @@
+from fastapi import Query, Response
+
+from app.core import settings
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class Pagination:
+    """Query parameters of the keyset paginated list endpoints."""
+
+    def __init__(
+        self,
+        limit: int = Query(
+            settings.page_limit, ge=1, le=settings.page_limit_max,
+            description='Количество записей на странице.'),
+        cursor: str | None = Query(
+            None,
+            description=(f'Значение заголовка `{NEXT_CURSOR_HEADER}` '
+                         'предыдущей страницы.')),
+    ) -> None:
+        self.limit = limit
+        self.cursor = cursor
+
+    @staticmethod
+    def set_next_cursor(response: Response, cursor: str | None) -> None:
+        if cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -1,12 +1,14 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import post, user
+from app.api.endpoints import feed, metrics, post, user
 
 main_router = APIRouter()
 
 
 for router in (
     post.router,
+    feed.router,
     user.router,
+    metrics.router,
 ):
     main_router.include_router(router)
@@ -1,5 +1,4 @@
 from .config import settings  # noqa
-from .db import Base, get_async_session  # noqa
-from .init_db import create_admin  # noqa
+from .db import Base, get_async_session, get_read_only_session  # noqa
 from .user import (current_superuser, current_user, get_user_db,  # noqa
                    get_user_manager)
@@ -0,0 +1,83 @@
+"""Caches of the serialized responses."""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from time import monotonic
+from typing import Any
+
+
+class CacheBackend(ABC):
+    """Interface of the cache storages used by `CRUDBase`."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Returns the cached value or None if there is no such one."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Caches the value for `ttl` seconds."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Removes the value if cached."""
+
+
+class LRUCache(CacheBackend):
+    """In-process cache evicting the least recently used values
+       when `max_size` is reached."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_nowait(self, key: str) -> Any | None:
+        try:
+            expires, value = self._data[key]
+        except KeyError:
+            return None
+        if expires <= monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set_nowait(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = monotonic() + ttl, value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete_nowait(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get(self, key: str) -> bytes | None:
+        return self.get_nowait(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.set_nowait(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self.delete_nowait(key)
+
+
+class RedisCache(CacheBackend):
+    """Adapter of an asyncio Redis client, e.g. `redis.asyncio.Redis`,
+       to share the cache between the application workers."""
+
+    def __init__(self, client, prefix: str = 'cache:') -> None:
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseSettings, EmailStr
 
 
@@ -19,6 +21,41 @@ class Settings(BaseSettings):
     password_length = 3
     admin_email: EmailStr | None = None
     admin_password: str | None = None
+    cache_ttl: float = 60
+    cache_max_size: int = 10000
+    http_cache_max_age: int = 5
+    auth_cache_ttl: float = 60
+    auth_cache_max_size: int = 10000
+    password_hash_pool: Literal['thread', 'process'] = 'thread'
+    password_hash_workers: int = 4
+    page_limit: int = 50
+    page_limit_max: int = 500
+    query_budget: int = 10
+    like_counter_shards: int = 1
+    counter_buffer_enabled: bool = False
+    counter_buffer_flush_ms: int = 1000
+    counter_buffer_flush_events: int = 1000
+    bulk_chunk_size: int = 1000
+    export_batch_size: int = 1000
+    ranking_interval_seconds: float = 60
+    ranking_in_app: bool = True
+    ranking_gravity: float = 1.8
+    ranking_window_days: float = 7
+    feed_max_authors: int = 500
+    timeline_enabled: bool = False
+    timeline_max_length: int = 1000
+    timeline_max_users: int = 10000
+    timeline_celebrity_followers: int = 10000
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_query_cache_size: int = 500
+    db_prepared_statement_cache_size: int = 100
+    database_replica_urls: list[str] = []
+    replica_cooldown: float = 30
+    replica_sticky_seconds: float = 5
 
     class Config:
         env_file = '.env'
@@ -1,11 +1,13 @@
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
 from sqlalchemy import Column, Integer, MetaData
-from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
-                                    create_async_engine)
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    async_sessionmaker, create_async_engine)
 from sqlalchemy.orm import declarative_base, declared_attr
 
 from app.core.config import settings
+from app.core.pool import engine_options, observe_pool
+from app.core.request_stats import observe_queries
 
 
 class PreBase:
@@ -25,10 +27,59 @@ metadata = MetaData(naming_convention={
     "pk": "pk_%(table_name)s",
 })
 Base = declarative_base(cls=PreBase, metadata=metadata)
-engine = create_async_engine(settings.database_url)
+# `Session.info` key marking the sessions bound to a read replica
+READ_REPLICA = 'read_replica'
+engine = create_async_engine(
+    settings.database_url, **engine_options(settings.database_url))
+observe_pool(engine)
+observe_queries(engine)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
 
+class ReadOnlySession(AsyncSession):
+    """Session of the read-only requests. It works in autocommit mode
+       and returns the connection to the pool right after every query,
+       so the connection is not held during the response serialization.
+       The loaded objects stay in the identity map."""
+
+    async def release(self) -> None:
+        if self.in_transaction():
+            await self.commit()
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await super().execute(*args, **kwargs)
+        finally:
+            await self.release()
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await super().get(*args, **kwargs)
+        finally:
+            await self.release()
+
+
+def read_only_sessionmaker(
+    engine: AsyncEngine,
+    class_: type[ReadOnlySession] = ReadOnlySession,
+    **kwargs: Any,
+) -> async_sessionmaker[ReadOnlySession]:
+    """The sessions share the pool of the engine,
+       a connection is checked out on the first query only."""
+    return async_sessionmaker(
+        engine.execution_options(isolation_level='AUTOCOMMIT'),
+        class_=class_, expire_on_commit=False, autoflush=False,
+        **kwargs)
+
+
+ReadOnlySessionLocal = read_only_sessionmaker(engine)
+
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as async_session:
         yield async_session
+
+
+async def get_read_only_session() -> AsyncGenerator[ReadOnlySession, None]:
+    async with ReadOnlySessionLocal() as session:
+        yield session
@@ -1,37 +1,55 @@
-from contextlib import asynccontextmanager as acm
+"""Admin bootstrap, run once per deployment before the workers start:
+
+    python -m app.core.init_db
+"""
+import asyncio
 
 from fastapi_users.exceptions import UserAlreadyExists
+from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 from pydantic import EmailStr
+from sqlalchemy import exists, func, select
+from sqlalchemy.exc import IntegrityError
 
 from app.core.config import settings
-from app.core.db import get_async_session
-from app.core.user import get_user_db, get_user_manager
+from app.core.db import AsyncSessionLocal, engine
+from app.core.user import UserManager
+from app.models.user import User
 from app.schemas.user import UserCreate
 
-get_async_session_context = acm(get_async_session)
-get_user_db_context = acm(get_user_db)
-get_user_manager_context = acm(get_user_manager)
-
 
 async def create_user(
-        email: EmailStr, password: str, is_superuser: bool = False):
-    try:
-        async with get_async_session_context() as session:
-            async with get_user_db_context(session) as user_db:
-                async with get_user_manager_context(user_db) as user_manager:
-                    await user_manager.create(UserCreate(
-                        email=email,
-                        password=password,
-                        is_superuser=is_superuser))
-    except UserAlreadyExists:
-        pass
-
-
-async def create_admin():
+        email: EmailStr, password: str, is_superuser: bool = False) -> bool:
+    """Creates the user unless the e-mail is taken, returns True if created.
+       The password is only hashed for a new user."""
+    async with AsyncSessionLocal() as session:
+        if await session.scalar(select(exists().where(
+                func.lower(User.email) == func.lower(email)))):
+            return False
+        try:
+            await UserManager(SQLAlchemyUserDatabase(session, User)).create(
+                UserCreate(email=email, password=password,
+                           is_superuser=is_superuser))
+        except (UserAlreadyExists, IntegrityError):
+            # Created concurrently.
+            return False
+        return True
+
+
+async def create_admin() -> bool:
     if (
         settings.admin_email is not None and
         settings.admin_password is not None
     ):
-        await create_user(email=settings.admin_email,
-                          password=settings.admin_password,
-                          is_superuser=True)
+        return await create_user(email=settings.admin_email,
+                                 password=settings.admin_password,
+                                 is_superuser=True)
+    return False
+
+
+async def main() -> None:
+    await create_admin()
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+"""Password hashing and verification off the event loop."""
+from typing import Callable, Literal
+
+import sniffio
+from anyio import CapacityLimiter, to_process, to_thread
+from fastapi_users.password import PasswordHelper
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+CONTEXT = CryptContext(schemes=['bcrypt'], deprecated='auto')
+
+
+# Module level functions: the process pool workers import them by name.
+def hash_password(password: str) -> str:
+    return CONTEXT.hash(password)
+
+
+def verify_and_update(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return CONTEXT.verify_and_update(plain_password, hashed_password)
+
+
+class ExecutorPasswordHelper(PasswordHelper):
+    """`PasswordHelper` with async counterparts running bcrypt in at most
+       `workers` threads or processes at a time. bcrypt releases the GIL,
+       so threads are enough unless the worker process is CPU bound."""
+    RUNNERS: dict[str, Callable] = {
+        'thread': to_thread.run_sync,
+        'process': to_process.run_sync,
+    }
+
+    def __init__(
+        self,
+        pool: Literal['thread', 'process'] = settings.password_hash_pool,
+        workers: int = settings.password_hash_workers,
+    ) -> None:
+        super().__init__(CONTEXT)
+        self.run_sync = self.RUNNERS[pool]
+        self.workers = workers
+        self._limiters: dict[str, CapacityLimiter] = {}
+
+    def _limiter(self) -> CapacityLimiter:
+        # A limiter belongs to the async library it was created in.
+        library = sniffio.current_async_library()
+        if library not in self._limiters:
+            self._limiters[library] = CapacityLimiter(self.workers)
+        return self._limiters[library]
+
+    async def hash_async(self, password: str) -> str:
+        return await self.run_sync(
+            hash_password, password, limiter=self._limiter())
+
+    async def verify_and_update_async(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self.run_sync(
+            verify_and_update, plain_password, hashed_password,
+            limiter=self._limiter())
+
+
+password_helper = ExecutorPasswordHelper()
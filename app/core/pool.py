@@ -0,0 +1,78 @@
+"""Connection pool options and metrics of the database engines."""
+from time import perf_counter
+
+from prometheus_client import Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+POOL_LABELS = ('engine',)
+POOL_SIZE = Gauge(
+    'db_pool_size', 'Connections kept open by the pool.', POOL_LABELS)
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', 'Connections in use.', POOL_LABELS)
+POOL_OVERFLOW = Gauge(
+    'db_pool_overflow', 'Connections opened over the pool size.', POOL_LABELS)
+POOL_WAIT = Histogram(
+    'db_pool_wait_seconds', 'Time to check a connection out of the pool.',
+    POOL_LABELS)
+
+
+class ObservedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool measuring the connection checkout waits."""
+    metrics_name = 'primary'
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.labels(engine=self.metrics_name).observe(
+                perf_counter() - start)
+
+    def recreate(self) -> 'ObservedQueuePool':
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+def engine_options(database_url: str) -> dict:
+    """`create_async_engine` options of the settings. SQLite opens a file
+       per connection, so its pool is left with the defaults."""
+    options = {
+        'pool_pre_ping': settings.db_pool_pre_ping,
+        'query_cache_size': settings.db_query_cache_size,
+    }
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite':
+        return options
+    options.update(
+        poolclass=ObservedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    if url.get_driver_name() == 'asyncpg':
+        options['connect_args'] = {'prepared_statement_cache_size': (
+            settings.db_prepared_statement_cache_size)}
+    return options
+
+
+def observe_pool(engine: AsyncEngine, name: str = 'primary') -> None:
+    """Exposes the pool state of the engine as metrics labeled by name."""
+    sync_engine = engine.sync_engine
+    if isinstance(sync_engine.pool, ObservedQueuePool):
+        sync_engine.pool.metrics_name = name
+    checked_out = POOL_CHECKED_OUT.labels(engine=name)
+    event.listen(sync_engine, 'checkout', lambda *args: checked_out.inc())
+    event.listen(sync_engine, 'checkin', lambda *args: checked_out.dec())
+    if isinstance(sync_engine.pool, QueuePool):
+        # The engine replaces its pool on dispose(): look it up on scrape.
+        POOL_SIZE.labels(engine=name).set_function(
+            lambda: sync_engine.pool.size())
+        POOL_OVERFLOW.labels(engine=name).set_function(
+            lambda: max(sync_engine.pool.overflow(), 0))
@@ -0,0 +1,146 @@
+"""Routing of the read-only requests to the database replicas."""
+from time import monotonic
+from typing import Any, AsyncGenerator, Callable
+
+from fastapi import Depends
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.cache import CacheBackend, LRUCache
+from app.core.config import settings
+from app.core.db import (READ_REPLICA, ReadOnlySession, get_read_only_session,
+                         read_only_sessionmaker)
+from app.core.pool import engine_options, observe_pool
+from app.core.request_stats import observe_queries
+from app.core.user import current_user, optional_user
+from app.models.user import User
+
+
+class ReplicaSession(ReadOnlySession):
+    """Read-only session of a replica. A query failing to reach the
+       replica marks it down and is retried on the next healthy one,
+       so the queries themselves are the health checks."""
+    router: 'ReplicaRouter'
+    replica: int
+
+    async def _failover(self, method: Callable, *args, **kwargs):
+        while True:
+            try:
+                return await method(*args, **kwargs)
+            except (OperationalError, InterfaceError, OSError):
+                self.router.mark_down(self.replica)
+                replica = self.router.next_replica()
+                if replica is None:
+                    raise
+                await self.rollback()
+                self.replica = replica
+                self.bind = self.router.binds[replica]
+                self.sync_session.bind = self.bind.sync_engine
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._failover(super().execute, *args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._failover(super().get, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """Round-robin over the replicas, a replica failing a query is
+       skipped for `cooldown` seconds. Users who wrote within
+       `sticky_seconds` read from the primary to see their own writes.
+       The writers are kept in `writers`, in-process by default: use
+       a shared backend, e.g. `RedisCache`, with several workers."""
+
+    def __init__(
+        self,
+        urls: list[str],
+        cooldown: float = settings.replica_cooldown,
+        sticky_seconds: float = settings.replica_sticky_seconds,
+        writers: CacheBackend | None = None,
+    ) -> None:
+        self.engines = [
+            create_async_engine(url, **engine_options(url)) for url in urls]
+        for index, engine in enumerate(self.engines):
+            observe_pool(engine, f'replica{index}')
+            observe_queries(engine)
+        self._session_factories = [
+            read_only_sessionmaker(
+                engine, class_=ReplicaSession, info={READ_REPLICA: True})
+            for engine in self.engines]
+        self.binds = [
+            factory.kw['bind'] for factory in self._session_factories]
+        self.cooldown = cooldown
+        self.sticky_seconds = sticky_seconds
+        self._down_until = [0.0] * len(self.engines)
+        self._next = 0
+        self.writers = (
+            LRUCache(settings.cache_max_size) if writers is None else writers)
+
+    @staticmethod
+    def _writer_key(user_id: int) -> str:
+        return f'writer:{user_id}'
+
+    async def mark_written(self, user_id: int) -> None:
+        await self.writers.set(
+            self._writer_key(user_id), b'1', self.sticky_seconds)
+
+    async def is_sticky(self, user_id: int | None) -> bool:
+        return user_id is not None and (
+            await self.writers.get(self._writer_key(user_id)) is not None)
+
+    def mark_down(self, replica: int) -> None:
+        self._down_until[replica] = monotonic() + self.cooldown
+
+    def next_replica(self) -> int | None:
+        """Index of the next healthy replica, None if there is no such one.
+        """
+        now = monotonic()
+        for offset in range(len(self.engines)):
+            index = (self._next + offset) % len(self.engines)
+            if self._down_until[index] <= now:
+                self._next = index + 1
+                return index
+        return None
+
+    def open_session(self) -> ReplicaSession | None:
+        """Returns a session of the next healthy replica or None if there
+           is no such one. No connection is checked out until a query."""
+        replica = self.next_replica()
+        if replica is None:
+            return None
+        session = self._session_factories[replica]()
+        session.router = self
+        session.replica = replica
+        return session
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+replica_router = ReplicaRouter(settings.database_replica_urls)
+
+
+async def get_read_session(
+    user: User | None = Depends(optional_user),
+    primary: ReadOnlySession = Depends(get_read_only_session),
+) -> AsyncGenerator[ReadOnlySession, None]:
+    """Session of a replica, the primary one is used
+       if there are no healthy replicas or the user wrote recently."""
+    replica = None
+    if not await replica_router.is_sticky(getattr(user, 'id', None)):
+        replica = replica_router.open_session()
+    if replica is None:
+        yield primary
+    else:
+        async with replica:
+            yield replica
+
+
+async def current_writer(
+    user: User = Depends(current_user),
+) -> AsyncGenerator[User, None]:
+    """`current_user` whose next reads go to the primary."""
+    await replica_router.mark_written(user.id)
+    yield user
+    await replica_router.mark_written(user.id)
@@ -0,0 +1,166 @@
+"""Latency and database query statistics of the requests.
+
+`RequestStatsMiddleware` collects the statistics of every request,
+`observe_queries` adds the SQL statements of an engine to them and
+`timed_serialization` the time spent in the response serializers.
+They are exposed by `/metrics` labeled by route and as the
+`Server-Timing` header of the response.
+"""
+import logging
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Callable
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LABELS = ('method', 'route')
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+ROWS_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Request latency.', LABELS)
+REQUEST_SQL_STATEMENTS = Histogram(
+    'http_request_sql_statements', 'SQL statements per request.', LABELS,
+    buckets=COUNT_BUCKETS)
+REQUEST_SQL_DURATION = Histogram(
+    'http_request_sql_duration_seconds', 'SQL time per request.', LABELS)
+REQUEST_SQL_ROWS = Histogram(
+    'http_request_sql_rows',
+    'Rows returned by SQL per request, estimated: rows prefetched by '
+    'the async driver adapter or the rowcount, streamed rows are not '
+    'counted.', LABELS, buckets=ROWS_BUCKETS)
+REQUEST_SERIALIZATION_DURATION = Histogram(
+    'http_request_serialization_duration_seconds',
+    'Response serialization time per request.', LABELS)
+QUERY_BUDGET_EXCEEDED = Counter(
+    'http_request_query_budget_exceeded_total',
+    'Requests running more SQL statements than the query budget.', LABELS)
+QUERY_START = 'request_stats_query_start'
+
+
+class RequestStats:
+    __slots__ = ('statements', 'sql_duration', 'rows',
+                 'serialization_duration')
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.sql_duration = 0.0
+        self.rows = 0
+        self.serialization_duration = 0.0
+
+    def server_timing(self, duration: float) -> str:
+        return (
+            f'app;dur={duration * 1000:.2f}, '
+            f'db;dur={self.sql_duration * 1000:.2f};'
+            f'desc="{self.statements} statements / {self.rows} rows", '
+            f'serialization;dur={self.serialization_duration * 1000:.2f}')
+
+
+current_stats: ContextVar[RequestStats | None] = ContextVar(
+    'request_stats', default=None)
+
+
+def _returned_rows(cursor) -> int:
+    """The async driver adapters prefetch the rows of buffered cursors.
+       Their buffer is not a DBAPI attribute, so the rowcount, -1 for
+       SELECT on most drivers, is the fallback if an adapter changes.
+       Server side cursors of the streamed results are not counted."""
+    rows = getattr(cursor, '_rows', None)
+    if rows is not None:
+        return len(rows)
+    return max(cursor.rowcount, 0)
+
+
+def observe_queries(engine: AsyncEngine) -> None:
+    """Adds the statements of the engine to the current request stats."""
+    sync_engine = engine.sync_engine
+
+    def before_cursor_execute(conn, *args) -> None:
+        if current_stats.get() is not None:
+            conn.info.setdefault(QUERY_START, []).append(perf_counter())
+
+    def after_cursor_execute(conn, cursor, *args) -> None:
+        stats = current_stats.get()
+        if stats is not None and conn.info.get(QUERY_START):
+            stats.statements += 1
+            stats.sql_duration += perf_counter() - conn.info[QUERY_START].pop()
+            stats.rows += _returned_rows(cursor)
+
+    event.listen(sync_engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def timed_serialization(function: Callable) -> Callable:
+    """Adds the run time of the serializer to the current request stats."""
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        stats = current_stats.get()
+        if stats is None:
+            return function(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats.serialization_duration += perf_counter() - start
+
+    return wrapper
+
+
+class RequestStatsMiddleware:
+    """Records the request stats labeled by the route path template and
+       flags the requests running more than `query_budget` statements,
+       `settings.query_budget` by default, 0 disables the budget."""
+
+    def __init__(
+        self, app: ASGIApp, query_budget: int | None = None
+    ) -> None:
+        self.app = app
+        self.query_budget = query_budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = perf_counter()
+
+        async def send_with_server_timing(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                MutableHeaders(scope=message).append(
+                    'Server-Timing',
+                    stats.server_timing(perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            current_stats.reset(token)
+            self.record(scope, stats, perf_counter() - start)
+
+    def record(self, scope: Scope, stats: RequestStats, duration: float):
+        labels = {
+            'method': scope['method'],
+            'route': getattr(scope.get('route'), 'path', 'unmatched'),
+        }
+        REQUEST_DURATION.labels(**labels).observe(duration)
+        REQUEST_SQL_STATEMENTS.labels(**labels).observe(stats.statements)
+        REQUEST_SQL_DURATION.labels(**labels).observe(stats.sql_duration)
+        REQUEST_SQL_ROWS.labels(**labels).observe(stats.rows)
+        REQUEST_SERIALIZATION_DURATION.labels(**labels).observe(
+            stats.serialization_duration)
+        budget = (settings.query_budget if self.query_budget is None
+                  else self.query_budget)
+        if budget and stats.statements > budget:
+            QUERY_BUDGET_EXCEEDED.labels(**labels).inc()
+            logger.warning(
+                '%s %s ran %d SQL statements, the query budget is %d.',
+                labels['method'], labels['route'], stats.statements, budget)
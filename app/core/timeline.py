@@ -0,0 +1,215 @@
+"""Fan-out-on-write timelines of the feed.
+
+A timeline holds the keys `(created timestamp, post id)` of the latest
+posts of the authors followed by the user, newest first, at most
+`max_length` of them. A truncated timeline has lost its oldest keys,
+so the feed past its end has to be read from the DB.
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_right, insort
+from collections import OrderedDict
+from typing import Iterable
+
+Key = tuple[float, int]
+Page = tuple[list[Key], bool]
+
+
+class TimelineBackend(ABC):
+    """Interface of the timeline storages used by `PostCRUD`."""
+
+    def __init__(self, max_length: int) -> None:
+        self.max_length = max_length
+
+    @abstractmethod
+    async def get(
+        self, user_id: int, after: Key | None, limit: int | None
+    ) -> Page | None:
+        """Returns at most `limit` keys following `after` and whether the
+           timeline is truncated, None if the user has no timeline."""
+
+    @abstractmethod
+    async def set(
+        self, user_id: int, keys: list[Key], truncated: bool
+    ) -> None:
+        """Replaces the timeline of the user."""
+
+    @abstractmethod
+    async def push(self, user_ids: Iterable[int], key: Key) -> None:
+        """Adds the post to the existing timelines of the users."""
+
+    @abstractmethod
+    async def remove(self, user_ids: Iterable[int], post_id: int) -> None:
+        """Removes the post from the timelines of the users."""
+
+    @abstractmethod
+    async def delete(self, user_id: int) -> None:
+        """Removes the timeline of the user."""
+
+
+class _Timeline:
+    __slots__ = ('keys', 'truncated')
+
+    def __init__(self, keys: list[tuple[float, int]], truncated: bool):
+        # (-created, id) ascending is the feed order
+        self.keys = keys
+        self.truncated = truncated
+
+
+class MemoryTimelines(TimelineBackend):
+    """In-process timelines of at most `max_users` users evicting the
+       least recently read ones. Every worker has its own timelines,
+       use a shared backend with several workers."""
+
+    def __init__(self, max_length: int, max_users: int) -> None:
+        super().__init__(max_length)
+        self.max_users = max_users
+        self._timelines: OrderedDict[int, _Timeline] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._timelines)
+
+    def clear(self) -> None:
+        self._timelines.clear()
+
+    async def get(
+        self, user_id: int, after: Key | None, limit: int | None
+    ) -> Page | None:
+        timeline = self._timelines.get(user_id)
+        if timeline is None:
+            return None
+        self._timelines.move_to_end(user_id)
+        start = 0 if after is None else bisect_right(
+            timeline.keys, (-after[0], after[1]))
+        stop = None if limit is None else start + limit
+        return ([(-created, post_id)
+                 for created, post_id in timeline.keys[start:stop]],
+                timeline.truncated)
+
+    async def set(
+        self, user_id: int, keys: list[Key], truncated: bool
+    ) -> None:
+        ordered = sorted((-created, post_id) for created, post_id in keys)
+        self._timelines[user_id] = _Timeline(
+            ordered[:self.max_length],
+            truncated or len(ordered) > self.max_length)
+        self._timelines.move_to_end(user_id)
+        while len(self._timelines) > self.max_users:
+            self._timelines.popitem(last=False)
+
+    async def push(self, user_ids: Iterable[int], key: Key) -> None:
+        created, post_id = key
+        for user_id in user_ids:
+            timeline = self._timelines.get(user_id)
+            if timeline is None:
+                continue
+            insort(timeline.keys, (-created, post_id))
+            if len(timeline.keys) > self.max_length:
+                timeline.keys.pop()
+                timeline.truncated = True
+
+    async def remove(self, user_ids: Iterable[int], post_id: int) -> None:
+        for user_id in user_ids:
+            timeline = self._timelines.get(user_id)
+            if timeline is not None:
+                timeline.keys = [
+                    key for key in timeline.keys if key[1] != post_id]
+
+    async def delete(self, user_id: int) -> None:
+        self._timelines.pop(user_id, None)
+
+
+class RedisTimelines(TimelineBackend):
+    """Adapter of an asyncio Redis client, e.g. `redis.asyncio.Redis`,
+       to share the timelines between the application workers.
+
+    A timeline is a sorted set of the zero padded post ids scored by
+    the negated creation time, so that Redis order is the feed order,
+    and a flag key marking the timeline as built (`1` if truncated).
+    Both expire in `ttl` seconds after the last write.
+    """
+    ID_WIDTH = 20
+
+    def __init__(
+        self, client, max_length: int, ttl: float,
+        prefix: str = 'timeline:',
+    ) -> None:
+        super().__init__(max_length)
+        self.client = client
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    def _keys(self, user_id: int) -> tuple[str, str]:
+        key = f'{self.prefix}{user_id}'
+        return key, f'{key}:truncated'
+
+    def _member(self, post_id: int) -> str:
+        return f'{post_id:0{self.ID_WIDTH}d}'
+
+    @staticmethod
+    def _key(member: bytes | str, score: float) -> Key:
+        return -score, int(member)
+
+    async def get(
+        self, user_id: int, after: Key | None, limit: int | None
+    ) -> Page | None:
+        key, flag_key = self._keys(user_id)
+        truncated = await self.client.get(flag_key)
+        if truncated is None:
+            return None
+        if after is None:
+            entries = await self.client.zrange(
+                key, 0, -1 if limit is None else limit - 1, withscores=True)
+        else:
+            created, post_id = after
+            # Posts created at the same time are ordered by the member
+            ties = await self.client.zrangebyscore(
+                key, -created, -created, withscores=True)
+            entries = [
+                (member, score) for member, score in ties
+                if int(member) > post_id]
+            entries += await self.client.zrangebyscore(
+                key, f'({-created}', '+inf', start=0,
+                num=-1 if limit is None else limit, withscores=True)
+        keys = [self._key(member, score) for member, score in entries]
+        return keys[:limit], truncated in (b'1', '1')
+
+    async def set(
+        self, user_id: int, keys: list[Key], truncated: bool
+    ) -> None:
+        key, flag_key = self._keys(user_id)
+        truncated = truncated or len(keys) > self.max_length
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if keys:
+                pipe.zadd(key, {self._member(post_id): -created
+                                for created, post_id in keys})
+                pipe.zremrangebyrank(key, self.max_length, -1)
+                pipe.expire(key, self.ttl)
+            pipe.set(flag_key, int(truncated), ex=self.ttl)
+            await pipe.execute()
+
+    async def push(self, user_ids: Iterable[int], key: Key) -> None:
+        user_ids = list(user_ids)
+        created, post_id = key
+        async with self.client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                timeline_key, _ = self._keys(user_id)
+                pipe.zadd(timeline_key, {self._member(post_id): -created})
+                pipe.zremrangebyrank(timeline_key, self.max_length, -1)
+                pipe.expire(timeline_key, self.ttl)
+            results = await pipe.execute()
+        # Without the flag the timeline is rebuilt on the next read
+        async with self.client.pipeline(transaction=False) as pipe:
+            for user_id, removed in zip(user_ids, results[1::3]):
+                if removed:
+                    pipe.set(self._keys(user_id)[1], 1, xx=True, keepttl=True)
+            await pipe.execute()
+
+    async def remove(self, user_ids: Iterable[int], post_id: int) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.zrem(self._keys(user_id)[0], self._member(post_id))
+            await pipe.execute()
+
+    async def delete(self, user_id: int) -> None:
+        await self.client.delete(*self._keys(user_id))
@@ -1,20 +1,202 @@
-from typing import Optional, Union
+from hashlib import sha256
+from time import time
+from typing import Any, Optional, Union
 
+import jwt
 from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_users import (BaseUserManager, FastAPIUsers, IntegerIDMixin,
-                           InvalidPasswordException)
+                           InvalidPasswordException, exceptions)
 from fastapi_users.authentication import (AuthenticationBackend,
                                           BearerTransport, JWTStrategy)
+from fastapi_users.jwt import decode_jwt
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core.cache import CacheBackend, LRUCache
 from app.core.config import settings
 from app.core.db import get_async_session
+from app.core.password import ExecutorPasswordHelper, password_helper
 from app.models.user import User
 from app.schemas.user import UserCreate
 
 
+class UserCache:
+    """Authenticated users by token hash. The users are cached
+       in-process, the invalidation times are kept in `invalidations`,
+       in-process by default: use a shared backend, e.g. `RedisCache`,
+       with several workers, otherwise `ttl` bounds the staleness between
+       the workers."""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        invalidations: CacheBackend | None = None,
+    ) -> None:
+        self._cache = LRUCache(max_size)
+        self.ttl = ttl
+        # The users cached before an invalidation expire within `ttl`,
+        # so do the invalidation times
+        self.invalidations = (
+            LRUCache(max_size) if invalidations is None else invalidations)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _invalidation_key(user_id: int) -> str:
+        return f'user:{user_id}:invalidated'
+
+    async def get(self, token: str) -> User | None:
+        """Returns a detached copy, so requests do not share the object
+           and the session of the request updates it instead of
+           inserting."""
+        cached = self._cache.get_nowait(self._key(token))
+        if cached is None:
+            return None
+        read_at, values = cached
+        invalidated = await self.invalidations.get(
+            self._invalidation_key(values['id']))
+        if invalidated is not None and float(invalidated) >= read_at:
+            return None
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def set(
+        self, token: str, user: User, read_at: float, ttl: float
+    ) -> None:
+        """`read_at` is the `time()` before the user was read."""
+        ttl = min(ttl, self.ttl)
+        if ttl > 0:
+            values = {attr.key: getattr(user, attr.key)
+                      for attr in inspect(User).column_attrs}
+            self._cache.set_nowait(self._key(token), (read_at, values), ttl)
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drops every cached token of the user in every worker sharing
+           `invalidations`."""
+        await self.invalidations.set(
+            self._invalidation_key(user_id), repr(time()).encode(), self.ttl)
+
+    def clear(self) -> None:
+        """Drops the users cached by the process."""
+        self._cache.clear()
+
+
+user_cache = UserCache(settings.auth_cache_max_size, settings.auth_cache_ttl)
+
+
+class CachedJWTStrategy(JWTStrategy):
+    """Skips the token decoding and the user SELECT
+       for the tokens verified before."""
+
+    def __init__(self, *args: Any, cache: UserCache, ttl: float,
+                 **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        self.ttl = ttl
+
+    @staticmethod
+    async def _attach(
+        user: User, user_manager: BaseUserManager[User, int]
+    ) -> User:
+        """Merges the cached user into the session of the request without
+           a SELECT, so that the updates of `current_user` are UPDATEs."""
+        session = getattr(user_manager.user_db, 'session', None)
+        if session is None:
+            return user
+        return await session.merge(user, load=False)
+
+    async def read_token(
+        self,
+        token: Optional[str],
+        user_manager: BaseUserManager[User, int],
+    ) -> Optional[User]:
+        if token is None:
+            return None
+        user = await self.cache.get(token)
+        if user is not None:
+            return await self._attach(user, user_manager)
+        try:
+            data = decode_jwt(token, self.decode_key, self.token_audience,
+                              algorithms=[self.algorithm])
+            user_id = user_manager.parse_id(data['sub'])
+        except (jwt.PyJWTError, KeyError, exceptions.InvalidID):
+            return None
+        read_at = time()
+        try:
+            user = await user_manager.get(user_id)
+        except exceptions.UserNotExists:
+            return None
+        ttl = self.ttl
+        if 'exp' in data:
+            ttl = min(ttl, data['exp'] - time())
+        self.cache.set(token, user, read_at, ttl)
+        return user
+
+
 class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
+    """bcrypt runs in the pool of `password_helper`, not on the event loop.
+    """
+    password_helper: ExecutorPasswordHelper
+
+    def __init__(
+        self,
+        user_db: SQLAlchemyUserDatabase,
+        password_helper: ExecutorPasswordHelper = password_helper,
+    ) -> None:
+        super().__init__(user_db, password_helper)
+
+    async def create(
+        self,
+        user_create: UserCreate,
+        safe: bool = False,
+        request: Optional[Request] = None,
+    ) -> User:
+        await self.validate_password(user_create.password, user_create)
+        if await self.user_db.get_by_email(user_create.email) is not None:
+            raise exceptions.UserAlreadyExists()
+        user_dict = (
+            user_create.create_update_dict() if safe
+            else user_create.create_update_dict_superuser())
+        user_dict['hashed_password'] = await self.password_helper.hash_async(
+            user_dict.pop('password'))
+        created_user = await self.user_db.create(user_dict)
+        await self.on_after_register(created_user, request)
+        return created_user
+
+    async def authenticate(
+        self, credentials: OAuth2PasswordRequestForm
+    ) -> Optional[User]:
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            # Hash anyway to mitigate the timing attack.
+            await self.password_helper.hash_async(credentials.password)
+            return None
+        verified, updated_password_hash = (
+            await self.password_helper.verify_and_update_async(
+                credentials.password, user.hashed_password))
+        if not verified:
+            return None
+        if updated_password_hash is not None:
+            await self.user_db.update(
+                user, {'hashed_password': updated_password_hash})
+        return user
+
+    async def _update(self, user: User, update_dict: dict[str, Any]) -> User:
+        if 'password' in update_dict:
+            update_dict = update_dict.copy()
+            password = update_dict.pop('password')
+            await self.validate_password(password, user)
+            update_dict['hashed_password'] = (
+                await self.password_helper.hash_async(password))
+        return await super()._update(user, update_dict)
 
     async def validate_password(
         self,
@@ -34,6 +216,21 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
     ):
         print(f'Пользователь {user.email} зарегистрирован.')
 
+    async def on_after_update(
+        self, user: User, update_dict: dict, request: Optional[Request] = None
+    ):
+        await user_cache.invalidate(user.id)
+
+    async def on_after_verify(
+        self, user: User, request: Optional[Request] = None
+    ):
+        await user_cache.invalidate(user.id)
+
+    async def on_after_delete(
+        self, user: User, request: Optional[Request] = None
+    ):
+        await user_cache.invalidate(user.id)
+
 
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
     yield SQLAlchemyUserDatabase(session, User)
@@ -44,9 +241,11 @@ async def get_user_manager(user_db=Depends(get_user_db)):
 
 
 def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(
+    return CachedJWTStrategy(
         secret=settings.secret_key,
-        lifetime_seconds=settings.token_lifetime
+        lifetime_seconds=settings.token_lifetime,
+        cache=user_cache,
+        ttl=settings.auth_cache_ttl,
     )
 
 
@@ -64,4 +263,5 @@ fastapi_users = FastAPIUsers[User, int](
 
 
 current_user = fastapi_users.current_user(active=True)
+optional_user = fastapi_users.current_user(optional=True)
 current_superuser = fastapi_users.current_user(active=True, superuser=True)
@@ -1,12 +1,23 @@
+from hashlib import blake2b
 from http import HTTPStatus
-from typing import Any, Generic, Type, TypeVar
+from time import time
+from typing import (Any, AsyncIterator, Callable, Generic, Sequence, Type,
+                    TypeVar)
+from uuid import uuid4
 
 from fastapi import HTTPException
 from pydantic import BaseModel
-from sqlalchemy import exc, select
+from sqlalchemy import Row, Table, delete, exc, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import MANYTOONE
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.core import Base
+from app.core import Base, settings
+from app.core.cache import CacheBackend
+from app.core.db import READ_REPLICA
+
+from .pagination import decode_cursor, encode_cursor
 
 try:
     from app.models import User
@@ -17,40 +28,249 @@ ModelType = TypeVar('ModelType', bound=Base)
 CreateSchemaType = TypeVar('CreateSchemaType', bound=BaseModel)
 UpdateSchemaType = TypeVar('UpdateSchemaType', bound=BaseModel)
 
+DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def dialect_insert(session: AsyncSession, model: Type[Base] | Table):
+    """Returns `INSERT` of the session dialect
+       supporting `ON CONFLICT` clauses."""
+    dialect = session.get_bind().dialect.name
+    try:
+        return DIALECT_INSERTS[dialect](model)
+    except KeyError:
+        raise NotImplementedError(
+            f'ON CONFLICT is not supported for {dialect}.')
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     OBJECT_ALREADY_EXISTS = 'Object with such a unique values already exists.'
     NOT_FOUND = 'Object(s) not found.'
+    INVALID_CURSOR = 'Invalid pagination cursor.'
+    # Columns and relationships to join selected in the projection mode
+    projection: tuple = ()
+    projection_joins: tuple = ()
+    # Columns changing with every write of the object or of the joined
+    # objects serialized with it, see `etag`
+    version_columns: tuple = ()
 
-    def __init__(self, model: Type[ModelType]) -> None:
+    def __init__(
+        self,
+        model: Type[ModelType],
+        cache: CacheBackend | None = None,
+        cache_ttl: float = settings.cache_ttl,
+    ) -> None:
         self.model = model
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+
+# === Cache ===
+    def _cache_key(self, pk: int) -> str:
+        return f'{self.model.__tablename__}:{pk}'
+
+    async def invalidate(self, pk: int) -> None:
+        """Drops the cached representation of the object and changes its
+           version, the invalidation time, in the cache: the fills
+           started before are not cached in any worker."""
+        if self.cache is None:
+            return
+        key = self._cache_key(pk)
+        await self.cache.set(
+            f'{key}:version', f'{time()} {uuid4().hex}'.encode(),
+            max(self.cache_ttl, settings.replica_sticky_seconds))
+        await self.cache.delete(key)
+
+    def _pack(self, data: bytes, etag: str | None) -> bytes:
+        if not self.version_columns:
+            return data
+        return (etag or '').encode() + b'\n' + data
+
+    def _unpack(self, cached: bytes) -> tuple[bytes, str | None]:
+        if not self.version_columns:
+            return cached, None
+        etag, data = cached.split(b'\n', 1)
+        return data, etag.decode() or None
+
+    async def get_serialized_with_etag_or_404(
+        self,
+        session: AsyncSession,
+        pk: int,
+        serializer: Callable[[ModelType | Row], bytes],
+        projection: bool = False,
+    ) -> tuple[bytes, str | None]:
+        """Returns the serialized object and its ETag from the cache if
+           possible. The ETag is None if there are no `version_columns`
+           or out of the projection mode, as they may refer to the joined
+           objects. On a cache miss the object (or its projection row) is
+           loaded and the result of
+           `serializer` is cached unless the object was invalidated
+           meanwhile or, if it is read from a replica, recently: replicas
+           may return the invalidated objects until they catch up."""
+        async def load() -> tuple[bytes, str | None]:
+            obj = await self.get_by_attr(
+                session, 'id', pk, exception=True, projection=projection)
+            return serializer(obj), (
+                self.etag(obj) if self.version_columns and projection
+                else None)
+
+        if self.cache is None:
+            return await load()
+        key = self._cache_key(pk)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return self._unpack(cached)
+        version = await self.cache.get(f'{key}:version')
+        data, etag = await load()
+        if version == await self.cache.get(f'{key}:version') and not (
+            version is not None and session.info.get(READ_REPLICA) and
+            float(version.split()[0]) >
+            time() - settings.replica_sticky_seconds
+        ):
+            await self.cache.set(key, self._pack(data, etag), self.cache_ttl)
+        return data, etag
+
+    async def get_serialized_or_404(
+        self,
+        session: AsyncSession,
+        pk: int,
+        serializer: Callable[[ModelType | Row], bytes],
+        projection: bool = False,
+    ) -> bytes:
+        data, _ = await self.get_serialized_with_etag_or_404(
+            session, pk, serializer, projection)
+        return data
+
+# === Versions ===
+    def etag(self, *objects: ModelType | Row) -> str:
+        """Strong ETag of the `version_columns` values of the objects."""
+        if not self.version_columns:
+            raise NotImplementedError('version_columns must be defined.')
+        version = repr([
+            tuple(getattr(obj, column.key) for column in self.version_columns)
+            for obj in objects])
+        return f'"{blake2b(version.encode(), digest_size=16).hexdigest()}"'
+
+    async def get_version_or_404(
+        self, session: AsyncSession, pk: int
+    ) -> Row:
+        """Selects the `version_columns` of the object only."""
+        version = (await session.execute(
+            self._select_columns(self.version_columns)
+            .where(self.model.id == pk))).first()
+        if version is None:
+            raise HTTPException(HTTPStatus.NOT_FOUND, self.NOT_FOUND)
+        return version
+
+    async def get_versions(
+        self,
+        session: AsyncSession,
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> list[Row]:
+        """Selects the `version_columns` of the `get_all` page only."""
+        return (await session.execute(self._paginate(
+            self._select_columns(self.version_columns)
+            .order_by(self.model.id),
+            limit, cursor))).all()
+
+    async def get_etag_or_404(self, session: AsyncSession, pk: int) -> str:
+        """Returns the cached ETag or the one of the selected version,
+           the object is neither loaded nor serialized."""
+        if self.cache is not None:
+            cached = await self.cache.get(self._cache_key(pk))
+            if cached is not None:
+                _, etag = self._unpack(cached)
+                if etag is not None:
+                    return etag
+        return self.etag(await self.get_version_or_404(session, pk))
 
 # === Read ===
+    def decode_cursor(self, cursor: str) -> int:
+        """Returns the last seen primary key. Raises `BAD_REQUEST` exception
+           if the cursor was not produced by `next_cursor`."""
+        try:
+            pk, = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(HTTPStatus.BAD_REQUEST, self.INVALID_CURSOR)
+        if not isinstance(pk, int):
+            raise HTTPException(HTTPStatus.BAD_REQUEST, self.INVALID_CURSOR)
+        return pk
+
+    def next_cursor(
+        self, objects: list[ModelType], limit: int | None
+    ) -> str | None:
+        """Returns the cursor of the next page or None if it is the last one.
+        """
+        if limit is None or len(objects) < limit:
+            return None
+        return encode_cursor(objects[-1].id)
+
+    def _paginate(self, query, limit: int | None, cursor: str | None):
+        """Applies keyset pagination by `id` to the query."""
+        if cursor is not None:
+            query = query.where(self.model.id > self.decode_cursor(cursor))
+        return query if limit is None else query.limit(limit)
+
+    def _select(self, projection: bool = False):
+        """Returns SELECT of the model objects or, in the projection mode,
+           of the `projection` columns only. Projection rows bypass the
+           identity map and attribute instrumentation, use them for
+           read-only endpoints."""
+        if not projection:
+            return select(self.model)
+        if not self.projection:
+            raise NotImplementedError('projection must be defined.')
+        return self._select_columns(self.projection)
+
+    def _select_columns(self, columns: Sequence):
+        """SELECT of the columns of the model and the `projection_joins`.
+        """
+        query = select(*columns).select_from(self.model)
+        for relationship in self.projection_joins:
+            query = query.join(relationship)
+        return query
+
     async def __get_by_attribute(
         self,
         session: AsyncSession,
-        attr_name: str,
+        attr_name: str | None,
         attr_value: Any,
+        limit: int | None = None,
+        cursor: str | None = None,
+        projection: bool = False,
     ):
-        return await session.scalars(
-            select(self.model).where(
-                getattr(self.model, attr_name) == attr_value
-            ).order_by(self.model.id))
+        query = self._select(projection)
+        if attr_name is not None:
+            query = query.where(getattr(self.model, attr_name) == attr_value)
+        query = self._paginate(query.order_by(self.model.id), limit, cursor)
+        if projection:
+            return await session.execute(query)
+        return await session.scalars(query)
 
     async def get_all_by_attr(
         self,
         session: AsyncSession,
         attr_name: str | None = None,
         attr_value: Any | None = None,
-        exception: bool = False
-    ) -> list[ModelType] | None:
+        exception: bool = False,
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+        projection: bool = False,
+    ) -> list[ModelType] | list[Row] | None:
         """Raises `NOT_FOUND` exception if
-           no objects are found and `exception=True`."""
-        if attr_name is not None and attr_value is not None:
-            objs = await self.__get_by_attribute(
-                session, attr_name, attr_value)
-        else:
-            objs = await session.scalars(select(self.model))
+           no objects are found and `exception=True`.
+           Returns at most `limit` objects following the `cursor`
+           if they are provided, see `next_cursor`.
+           Returns `projection` rows instead of objects if `projection=True`.
+        """
+        if attr_value is None:
+            attr_name = None
+        objs = await self.__get_by_attribute(
+            session, attr_name, attr_value, limit, cursor, projection)
         objects = objs.all()
         if not objects and exception:
             raise HTTPException(HTTPStatus.NOT_FOUND, self.NOT_FOUND)
@@ -61,12 +281,14 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         session: AsyncSession,
         attr_name: str,
         attr_value: Any,
-        exception: bool = False
-    ) -> ModelType | None:
-        """Raises `NOT_FOUND` exception if
+        exception: bool = False,
+        projection: bool = False,
+    ) -> ModelType | Row | None:
+        """Returns the first object by `id` with the attribute value.
+           Raises `NOT_FOUND` exception if
            no object is found and `exception=True`."""
         objs = await self.__get_by_attribute(
-            session, attr_name, attr_value)
+            session, attr_name, attr_value, limit=1, projection=projection)
         object = objs.first()
         if object is None and exception:
             raise HTTPException(HTTPStatus.NOT_FOUND, self.NOT_FOUND)
@@ -75,17 +297,68 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     async def get(
         self, session: AsyncSession, pk: int,
     ) -> ModelType | None:
-        return await self.get_by_attr(session, 'id', pk)
+        """Takes the object from the identity map of the session
+           if it is already loaded, otherwise selects it by primary key."""
+        return await session.get(self.model, pk)
 
     async def get_or_404(
         self, session: AsyncSession, pk: int,
     ) -> ModelType:
-        return await self.get_by_attr(session, 'id', pk, exception=True)
+        object = await self.get(session, pk)
+        if object is None:
+            raise HTTPException(HTTPStatus.NOT_FOUND, self.NOT_FOUND)
+        return object
 
     async def get_all(
-        self, session: AsyncSession, exception: bool = False
-    ) -> list[ModelType]:
-        return await self.get_all_by_attr(session, exception=exception)
+        self,
+        session: AsyncSession,
+        exception: bool = False,
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+        projection: bool = False,
+    ) -> list[ModelType] | list[Row]:
+        return await self.get_all_by_attr(
+            session, exception=exception, limit=limit, cursor=cursor,
+            projection=projection)
+
+    async def stream(
+        self,
+        session: AsyncSession,
+        *criteria: Any,
+        order_by: tuple = (),
+        projection: bool = False,
+        batch_size: int = settings.export_batch_size,
+    ) -> AsyncIterator[list[ModelType] | list[Row]]:
+        """Yields the objects by batches of `batch_size` fetched
+           from a server-side cursor, memory use does not depend
+           on the number of the objects."""
+        query = (self._select(projection).where(*criteria)
+                 .order_by(*order_by or (self.model.id,))
+                 .execution_options(yield_per=batch_size))
+        result = await session.stream(query)
+        if not projection:
+            result = result.scalars()
+        async for objects in result.partitions():
+            yield objects
+
+    async def _load_relationships(
+        self, session: AsyncSession, obj: ModelType
+    ) -> ModelType:
+        """Populates many-to-one relationships of the object which was
+           loaded without them, e.g. by `UPDATE ... RETURNING`.
+           Related objects are taken from the identity map if possible."""
+        mapper = inspect(self.model)
+        for relationship in mapper.relationships:
+            if relationship.direction is not MANYTOONE:
+                continue
+            column, = relationship.local_columns
+            pk = getattr(obj, mapper.get_property_by_column(column).key)
+            set_committed_value(
+                obj, relationship.key,
+                None if pk is None else
+                await session.get(relationship.mapper.class_, pk))
+        return obj
 
 # === Create, Update, Delete ===
     def has_permission(self, obj: ModelType, user: User) -> None:
@@ -114,6 +387,37 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Modify update_data here if necessary and return updated object."""
         raise NotImplementedError('perform_update() must be implemented.')
 
+    def perform_update_data(self, update_data: dict) -> None:
+        """Modify update_data here if necessary, the object is not loaded.
+           Used instead of perform_update by the single-statement update."""
+        raise NotImplementedError('perform_update_data() must be implemented.')
+
+    def write_clause(self, user: User | None) -> Any:
+        """SQL condition replacing `has_permission`, `is_update_allowed`
+           and `is_delete_allowed` in single-statement update/delete.
+           None turns single-statement writes off."""
+
+    async def _write_returning(
+        self, session: AsyncSession, statement: Any, pk: int,
+    ) -> ModelType | None:
+        """Runs `UPDATE/DELETE ... RETURNING` in one round trip.
+           Returns None if no row matched `write_clause`."""
+        try:
+            obj = (await session.scalars(
+                statement.returning(self.model)
+                .execution_options(populate_existing=True))).first()
+        except exc.IntegrityError:
+            await session.rollback()
+            raise HTTPException(
+                HTTPStatus.BAD_REQUEST,
+                self.OBJECT_ALREADY_EXISTS)
+        if obj is None:
+            return None
+        await self._load_relationships(session, obj)
+        await session.commit()
+        await self.invalidate(pk)
+        return obj
+
     async def _save(
             self, session: AsyncSession, obj: ModelType) -> ModelType:
         """Tries to write object to DB. Raises `BAD_REQUEST` exception
@@ -143,6 +447,50 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             self.perform_create(create_data, user)
         return await self._save(session, self.model(**create_data))
 
+    async def bulk_create(
+        self,
+        session: AsyncSession,
+        payloads: Sequence[CreateSchemaType],
+        *,
+        user: User | None = None,
+        perform_create: bool = True,
+        chunk_size: int = settings.bulk_chunk_size,
+    ) -> list[int]:
+        """Inserts the objects by `chunk_size` rows per statement and
+           commit, skipping the rows that violate the unique columns.
+           Returns the indexes of the skipped payloads."""
+        table = self.model.__table__
+        unique = [column for column in table.columns if column.unique]
+        statement = (
+            dialect_insert(session, table)
+            .on_conflict_do_nothing()
+            .returning(*unique or table.primary_key.columns))
+        conflicts = []
+        for start in range(0, len(payloads), chunk_size):
+            rows = [payload.dict() for payload in
+                    payloads[start:start + chunk_size]]
+            if perform_create:
+                for create_data in rows:
+                    self.perform_create(create_data, user)
+            try:
+                inserted = {tuple(row) for row in
+                            await session.execute(statement, rows)}
+                await session.commit()
+            except exc.IntegrityError:
+                await session.rollback()
+                raise HTTPException(
+                    HTTPStatus.BAD_REQUEST,
+                    self.OBJECT_ALREADY_EXISTS)
+            if not unique:
+                continue
+            seen = set()
+            for index, create_data in enumerate(rows, start):
+                key = tuple(create_data[column.key] for column in unique)
+                if key in seen or key not in inserted:
+                    conflicts.append(index)
+                seen.add(key)
+        return conflicts
+
     async def update(
         self,
         session: AsyncSession,
@@ -158,21 +506,39 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             for key in update_data:
                 setattr(obj, key, update_data[key])
             ```
+           If `write_clause` is defined, the update is made by a single
+           `UPDATE ... RETURNING` and the object is loaded only if
+           no row matched in order to tell 404 and permission errors apart.
         """
-        obj = await self.get_or_404(session, pk)
-        if user is not None:
-            self.has_permission(obj, user)
         update_data = payload.dict(
             exclude_unset=True,
             exclude_none=True,
             exclude_defaults=True)
+        clause = self.write_clause(user)
+        if clause is not None and (update_data or perform_update):
+            values = dict(update_data)
+            if perform_update:
+                self.perform_update_data(values)
+            obj = await self._write_returning(
+                session,
+                update(self.model)
+                .where(self.model.id == pk, clause)
+                .values(**values),
+                pk)
+            if obj is not None:
+                return obj
+        obj = await self.get_or_404(session, pk)
+        if user is not None:
+            self.has_permission(obj, user)
         self.is_update_allowed(obj, update_data)
         if perform_update:
             obj = self.perform_update(obj, update_data)
         else:
             for key in update_data:
                 setattr(obj, key, update_data[key])
-        return await self._save(session, obj)
+        obj = await self._save(session, obj)
+        await self.invalidate(pk)
+        return obj
 
     async def delete(
         self,
@@ -180,10 +546,21 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         pk: int,
         user: User | None = None,
     ) -> ModelType:
+        """Single `DELETE ... RETURNING` if `write_clause` is defined."""
+        clause = self.write_clause(user)
+        if clause is not None:
+            obj = await self._write_returning(
+                session,
+                delete(self.model).where(self.model.id == pk, clause),
+                pk)
+            if obj is not None:
+                session.expunge(obj)
+                return obj
         obj = await self.get_or_404(session, pk)
         if user is not None:
             self.has_permission(obj, user)
         self.is_delete_allowed(obj)
         await session.delete(obj)
         await session.commit()
+        await self.invalidate(pk)
         return obj
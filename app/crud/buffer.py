@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import Callable
+
+from sqlalchemy import case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Post
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """Write-behind buffer of the post LIKE/DISLIKE counters.
+
+    Deltas are summed up per post in memory and written to the DB
+    by batched `UPDATE ... CASE` statements every `flush_interval_ms`
+    or as soon as `flush_events` deltas are collected.
+    """
+    BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        flush_interval_ms: int,
+        flush_events: int,
+    ) -> None:
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_events = flush_events
+        self._deltas: dict[int, tuple[int, int]] = {}
+        self._flushing: dict[int, tuple[int, int]] = {}
+        self._events = 0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    def _merge(self, post_id: int, likes: int, dislikes: int) -> None:
+        old_likes, old_dislikes = self._deltas.get(post_id, (0, 0))
+        self._deltas[post_id] = old_likes + likes, old_dislikes + dislikes
+
+    def add(self, post_id: int, likes: int, dislikes: int) -> None:
+        self._merge(post_id, likes, dislikes)
+        self._events += 1
+        if self._events >= self.flush_events and (
+                self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._safe_flush())
+
+    def pending(self, post_id: int) -> tuple[int, int]:
+        """Deltas of the post which are not committed to the DB yet."""
+        likes, dislikes = self._deltas.get(post_id, (0, 0))
+        flushing_likes, flushing_dislikes = self._flushing.get(
+            post_id, (0, 0))
+        return likes + flushing_likes, dislikes + flushing_dislikes
+
+    @staticmethod
+    def _update_statement(deltas: dict[int, tuple[int, int]]):
+        def delta(index: int):
+            return case(
+                {post_id: values[index] for post_id, values in deltas.items()},
+                value=Post.id, else_=0)
+
+        return (
+            update(Post)
+            .where(Post.id.in_(deltas))
+            .values(likes=Post.likes + delta(0),
+                    dislikes=Post.dislikes + delta(1),
+                    rating=Post.rating + delta(0) - delta(1))
+            .execution_options(synchronize_session=False))
+
+    async def flush(self) -> int:
+        """Writes the collected deltas, returns the number of updated posts.
+           Deltas are kept in the buffer if the write fails."""
+        async with self._lock:
+            self._flushing, self._deltas = self._deltas, {}
+            self._events = 0
+            deltas = list(self._flushing.items())
+            try:
+                async with self.session_factory() as session:
+                    for i in range(0, len(deltas), self.BATCH_SIZE):
+                        await session.execute(self._update_statement(
+                            dict(deltas[i:i + self.BATCH_SIZE])))
+                    await session.commit()
+            except Exception:
+                for post_id, (likes, dislikes) in deltas:
+                    self._merge(post_id, likes, dislikes)
+                raise
+            finally:
+                self._flushing = {}
+            return len(deltas)
+
+    async def _safe_flush(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception('Post counters flush failed.')
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._safe_flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops periodic flushing and writes what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
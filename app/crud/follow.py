@@ -0,0 +1,78 @@
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import settings
+from app.models import Follow, User
+
+from .base import CRUDBase, dialect_insert
+from .post import post_crud
+
+
+class FollowCRUD(CRUDBase[Follow, None, None]):
+    NOT_FOUND = 'Пользователь не найден.'
+    SELF_FOLLOW_DENIED = 'Запрещено подписываться на самого себя.'
+
+    async def get_author_or_404(
+        self, session: AsyncSession, author_id: int
+    ) -> User:
+        author = await session.get(User, author_id)
+        if author is None:
+            raise HTTPException(HTTPStatus.NOT_FOUND, self.NOT_FOUND)
+        return author
+
+    async def _commit_change(
+        self, session: AsyncSession, statement, author: User, user: User,
+        followers: int,
+    ) -> None:
+        """Runs `INSERT/DELETE ... RETURNING` of the follow and, if it
+           wrote anything, changes the followers count of the author
+           and drops the timeline of the user to rebuild it. The author
+           crossing the celebrity threshold drops the timelines of all
+           the followers: fanned out posts and the posts merged on read
+           change places."""
+        if not (await session.scalars(statement.returning(Follow.id))).first():
+            return
+        count = await session.scalar(
+            update(User).where(User.id == author.id)
+            .values(followers=User.followers + followers)
+            .returning(User.followers))
+        await session.commit()
+        await post_crud.invalidate_timeline(user.id)
+        max_followers = settings.timeline_celebrity_followers
+        if (count > max_followers) != (count - followers > max_followers):
+            await post_crud.invalidate_author_timelines(session, author.id)
+
+    async def follow(
+        self, session: AsyncSession, author_id: int, user: User
+    ) -> User:
+        """Subscribes the user to the author, repeating it writes nothing.
+        """
+        if author_id == user.id:
+            raise HTTPException(
+                HTTPStatus.BAD_REQUEST, self.SELF_FOLLOW_DENIED)
+        author = await self.get_author_or_404(session, author_id)
+        await self._commit_change(
+            session,
+            dialect_insert(session, Follow)
+            .values(follower_id=user.id, author_id=author.id)
+            .on_conflict_do_nothing(
+                index_elements=(Follow.follower_id, Follow.author_id)),
+            author, user, 1)
+        return author
+
+    async def unfollow(
+        self, session: AsyncSession, author_id: int, user: User
+    ) -> User:
+        author = await self.get_author_or_404(session, author_id)
+        await self._commit_change(
+            session,
+            delete(Follow).where(
+                Follow.follower_id == user.id, Follow.author_id == author.id),
+            author, user, -1)
+        return author
+
+
+follow_crud = FollowCRUD(Follow)
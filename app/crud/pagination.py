@@ -0,0 +1,24 @@
+"""Opaque keyset cursors shared by the CRUD classes."""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from typing import Any
+
+
+def encode_cursor(*values: Any) -> str:
+    """Packs the keyset values of the last row into an opaque string."""
+    raw = json.dumps(values, default=str, separators=(',', ':'))
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    """Unpacks the cursor produced by `encode_cursor`.
+       Raises `ValueError` if the cursor is malformed."""
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (BinasciiError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(cursor) from e
+    if not isinstance(values, list):
+        raise ValueError(cursor)
+    return values
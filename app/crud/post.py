@@ -1,13 +1,43 @@
+import random
+from collections import namedtuple
 from datetime import datetime as dt
+from functools import cache
 from http import HTTPStatus
+from typing import AsyncIterator, Sequence
 
 from fastapi import HTTPException
+from sqlalchemy import (Row, and_, delete, event, func, inspect, or_, select,
+                        true, update)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models import Post, User
+from app.core import settings
+from app.core.cache import LRUCache
+from app.core.db import AsyncSessionLocal
+from app.core.timeline import Key, MemoryTimelines, TimelineBackend
+from app.models import Follow, Post, PostCounter, Reaction, User
 from app.schemas import PostCreate, PostUpdate
 
-from .base import CRUDBase
+from .base import CRUDBase, dialect_insert
+from .buffer import CounterBuffer
+from .pagination import decode_cursor, encode_cursor
+from .ranking import current_rating
+from .search import DIALECT_SEARCH_BACKENDS, SearchBackend
+
+COUNTER_OVERLAYS = 'counter_overlays'
+
+
+@cache
+def _row_type(fields: tuple[str]) -> type:
+    return namedtuple('PostRow', fields)
+
+
+@event.listens_for(Post, 'refresh')
+def _drop_counter_overlays(target: Post, context, attrs) -> None:
+    """Freshly loaded counters already include everything persisted."""
+    if attrs is None or {'likes', 'dislikes'} & set(attrs):
+        inspect(target).info.pop(COUNTER_OVERLAYS, None)
 
 
 class PostCRUD(CRUDBase[Post, PostCreate, PostUpdate]):
@@ -16,6 +46,24 @@ class PostCRUD(CRUDBase[Post, PostCreate, PostUpdate]):
     PERMISSION_DENIED = 'У вас нет права доступа к данному посту.'
     SELF_LIKE_DISLIKE_DENIED = (
         'Запрещено ставить LIKE/DISLIKE собственным постам.')
+    counter_buffer: CounterBuffer | None = None
+    # Fan-out-on-write timelines of the feed, None reads it from the DB
+    timelines: TimelineBackend | None = None
+    # None selects the database backend of the session dialect
+    search_backend: SearchBackend | None = None
+    author_columns = (
+        User.email.label('author_email'),
+        User.is_active.label('author_is_active'),
+        User.is_superuser.label('author_is_superuser'),
+        User.is_verified.label('author_is_verified'),
+    )
+    projection = (
+        Post.id, Post.title, Post.content, Post.created, Post.updated,
+        Post.likes, Post.dislikes, Post.author_id, *author_columns,
+    )
+    projection_joins = (Post.author,)
+    version_columns = (
+        Post.id, Post.updated, Post.likes, Post.dislikes, *author_columns)
 
     def __is_admin(self, user: User) -> bool:
         return user.is_superuser
@@ -25,9 +73,13 @@ class PostCRUD(CRUDBase[Post, PostCreate, PostUpdate]):
         if user is not None:
             create_data['author_id'] = user.id
 
+    def perform_update_data(self, update_data: dict) -> None:
+        """Adds the update time of the post."""
+        update_data['updated'] = dt.now()
+
     def perform_update(self, obj: Post, update_data: dict) -> Post:
         """Adds the update time and sets updated attributes of the post."""
-        update_data['updated'] = dt.now()
+        self.perform_update_data(update_data)
         for key in update_data:
             setattr(obj, key, update_data[key])
         return obj
@@ -37,6 +89,12 @@ class PostCRUD(CRUDBase[Post, PostCreate, PostUpdate]):
         if not (self.__is_admin(user) or user.id == obj.author_id):
             raise HTTPException(HTTPStatus.BAD_REQUEST, self.PERMISSION_DENIED)
 
+    def write_clause(self, user: User | None):
+        """Admin or author are only allowed to update/delete the post."""
+        if user is None or self.__is_admin(user):
+            return true()
+        return Post.author_id == user.id
+
     def is_delete_allowed(self, obj: Post) -> None:
         """Always allowed in the project."""
         pass
@@ -45,11 +103,540 @@ class PostCRUD(CRUDBase[Post, PostCreate, PostUpdate]):
         """Always allowed in the project."""
         pass
 
+# === Read ===
+    async def get_all_by_attr(
+        self, session: AsyncSession, *args, **kwargs
+    ) -> list[Post] | list[Row] | None:
+        return await self._merge_counters(
+            session, await super().get_all_by_attr(session, *args, **kwargs))
+
+    async def get_by_attr(
+        self, session: AsyncSession, *args, **kwargs
+    ) -> Post | Row | None:
+        post = await super().get_by_attr(session, *args, **kwargs)
+        if post is not None:
+            post, = await self._merge_counters(session, [post])
+        return post
+
+    async def get(self, session: AsyncSession, pk: int) -> Post | None:
+        post = await super().get(session, pk)
+        if post is not None:
+            await self._merge_counters(session, [post])
+        return post
+
+    async def get_version_or_404(self, session: AsyncSession, pk: int) -> Row:
+        version, = await self._merge_counters(
+            session, [await super().get_version_or_404(session, pk)])
+        return version
+
+    async def get_versions(
+        self, session: AsyncSession, **kwargs
+    ) -> list[Row]:
+        return await self._merge_counters(
+            session, await super().get_versions(session, **kwargs))
+
     async def get_user_posts(
-        self, session: AsyncSession, user: User, exception: bool = False
-    ) -> list[Post] | None:
+        self,
+        session: AsyncSession,
+        user: User,
+        exception: bool = False,
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+        projection: bool = False,
+    ) -> list[Post] | list[Row] | None:
         return await self.get_all_by_attr(
-            session, 'author_id', user.id, exception=exception)
+            session, 'author_id', user.id, exception=exception,
+            limit=limit, cursor=cursor, projection=projection)
+
+    def stream_posts(
+        self,
+        session: AsyncSession,
+        created_from: dt | None = None,
+        created_to: dt | None = None,
+    ) -> AsyncIterator[list[Row]]:
+        """Projection rows of the posts created in [created_from, created_to)
+           in the order of `ix_post_created_id`. The counters are the
+           persisted ones, pending buffer and shard deltas are not merged."""
+        criteria = []
+        if created_from is not None:
+            criteria.append(Post.created >= created_from)
+        if created_to is not None:
+            criteria.append(Post.created < created_to)
+        return self.stream(
+            session, *criteria, order_by=(Post.created.desc(), Post.id),
+            projection=True)
+
+# === Search ===
+    def get_search_backend(
+        self, session: AsyncSession, required: bool = True
+    ) -> SearchBackend:
+        """Without a backend for the session dialect raises
+           `NotImplementedError` or, if not `required`, returns the no-op
+           one, so that writes do not depend on the search."""
+        if self.search_backend is not None:
+            return self.search_backend
+        dialect = session.get_bind().dialect.name
+        try:
+            return DIALECT_SEARCH_BACKENDS[dialect]
+        except KeyError:
+            if not required:
+                return SearchBackend()
+            raise NotImplementedError(
+                f'Full-text search is not supported for {dialect}.')
+
+    def decode_rank_cursor(self, cursor: str) -> tuple[float, int]:
+        """Returns the rank and the id of the last seen post."""
+        try:
+            rank, pk = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(HTTPStatus.BAD_REQUEST, self.INVALID_CURSOR)
+        if not (isinstance(rank, (int, float)) and isinstance(pk, int)):
+            raise HTTPException(HTTPStatus.BAD_REQUEST, self.INVALID_CURSOR)
+        return rank, pk
+
+    def next_rank_cursor(
+        self, rows: list[Row], limit: int | None
+    ) -> str | None:
+        """Cursor of the rows ordered by `rank` desc and `id`."""
+        if limit is None or len(rows) < limit:
+            return None
+        return encode_cursor(rows[-1].rank, rows[-1].id)
+
+    async def search(
+        self,
+        session: AsyncSession,
+        query: str,
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> list[Row]:
+        """Projection rows of the matching posts with their `rank`,
+           the best matches first."""
+        if not query.split():
+            return []
+        matches = self.get_search_backend(session).matches(query)
+        return await self._get_ranked(
+            session,
+            self._select(projection=True)
+            .join(matches, matches.c.post_id == Post.id),
+            matches.c.rank, limit, cursor)
+
+    async def _get_ranked(
+        self,
+        session: AsyncSession,
+        statement,
+        rank,
+        limit: int | None,
+        cursor: str | None,
+    ) -> list[Row]:
+        """Adds `rank` to the projection rows, orders them by the rank desc
+           and `id`, applies keyset pagination and merges the counters."""
+        statement = statement.add_columns(rank.label('rank')).order_by(
+            rank.desc(), Post.id)
+        if cursor is not None:
+            last_rank, last_id = self.decode_rank_cursor(cursor)
+            statement = statement.where(or_(
+                rank < last_rank, and_(rank == last_rank, Post.id > last_id)))
+        if limit is not None:
+            statement = statement.limit(limit)
+        return await self._merge_counters(
+            session, (await session.execute(statement)).all())
+
+# === Top ===
+    TOP_ORDERS = {'hot': lambda: Post.hot, 'rating': current_rating}
+
+    async def get_top(
+        self,
+        session: AsyncSession,
+        order: str = 'hot',
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> list[Row]:
+        """Projection rows of the posts in the precomputed order of
+           `ix_post_hot_id` or `ix_post_rating_id`, the score is `rank`.
+           In the sharded counters mode the rating adds the shard sums,
+           so the order is sorted rather than read from the index."""
+        return await self._get_ranked(
+            session, self._select(projection=True), self.TOP_ORDERS[order](),
+            limit, cursor)
+
+# === Feed ===
+    def decode_feed_cursor(self, cursor: str) -> tuple[dt, int]:
+        """Returns the creation time and the id of the last seen post."""
+        try:
+            created, pk = decode_cursor(cursor)
+            created = dt.fromisoformat(created)
+        except (TypeError, ValueError):
+            raise HTTPException(HTTPStatus.BAD_REQUEST, self.INVALID_CURSOR)
+        if not isinstance(pk, int):
+            raise HTTPException(HTTPStatus.BAD_REQUEST, self.INVALID_CURSOR)
+        return created, pk
+
+    def next_feed_cursor(
+        self, rows: list[Row], limit: int | None
+    ) -> str | None:
+        """Cursor of the rows ordered by `created` desc and `id`."""
+        if limit is None or len(rows) < limit:
+            return None
+        return encode_cursor(rows[-1].created.isoformat(), rows[-1].id)
+
+    async def get_feed(
+        self,
+        session: AsyncSession,
+        user: User,
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+        celebrities: bool | None = None,
+    ) -> list[Row]:
+        """Projection rows of the latest posts of the authors followed by
+           the user, newest first. A single query merges the posts of at
+           most `feed_max_authors` most recently followed authors: every
+           author contributes at most `limit` posts read from the range of
+           `ix_post_author_id_created_id`, so a page costs
+           O(authors * limit) whatever the number of their posts. The
+           limit of the authors holds for every page, the posts of the
+           authors followed earlier are never read. `celebrities` selects
+           only the authors with more or not more than
+           `timeline_celebrity_followers` followers among them."""
+        followed = (
+            select(Follow.author_id)
+            .where(Follow.follower_id == user.id)
+            .order_by(Follow.id.desc())
+            .limit(settings.feed_max_authors)
+            .subquery('followed'))
+        if celebrities is not None:
+            is_celebrity = (
+                User.followers > settings.timeline_celebrity_followers)
+            followed = (
+                select(followed.c.author_id)
+                .join(User, User.id == followed.c.author_id)
+                .where(is_celebrity if celebrities else ~is_celebrity)
+                .subquery('followed_authors'))
+        latest = aliased(Post, name='latest')
+        latest_ids = (
+            select(latest.id)
+            .where(latest.author_id == followed.c.author_id)
+            .order_by(latest.created.desc(), latest.id)
+            .limit(limit))
+        if cursor is not None:
+            last_created, last_id = self.decode_feed_cursor(cursor)
+            # `<=` makes the keyset a range of the index
+            latest_ids = latest_ids.where(
+                latest.created <= last_created,
+                or_(latest.created < last_created, latest.id > last_id))
+        statement = self._select(projection=True)
+        if session.get_bind().dialect.name == 'postgresql':
+            latest_ids = latest_ids.lateral('latest')
+            statement = statement.where(Post.id.in_(
+                select(latest_ids.c.id)
+                .select_from(followed.join(latest_ids, true()))))
+        else:
+            # SQLite runs the correlated subquery once per followed author
+            statement = statement.join(followed, Post.id.in_(latest_ids))
+        statement = statement.order_by(Post.created.desc(), Post.id)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return await self._merge_counters(
+            session, (await session.execute(statement)).all())
+
+# === Timelines ===
+    @staticmethod
+    def _timeline_key(created: dt, pk: int) -> Key:
+        return created.timestamp(), pk
+
+    async def invalidate_timeline(self, user_id: int) -> None:
+        if self.timelines is not None:
+            await self.timelines.delete(user_id)
+
+    async def invalidate_author_timelines(
+        self, session: AsyncSession, author_id: int
+    ) -> None:
+        """Drops the timelines of all the followers of the author."""
+        if self.timelines is not None:
+            for follower_id in await session.scalars(
+                    select(Follow.follower_id)
+                    .where(Follow.author_id == author_id)):
+                await self.timelines.delete(follower_id)
+
+    async def _timeline_followers(
+        self, session: AsyncSession, author_id: int
+    ) -> list[int]:
+        """Followers whose timelines get the posts of the author, none for
+           a celebrity, reads at most `timeline_celebrity_followers` + 1
+           entries of `ix_follow_author_id_follower_id`. As in `get_feed`,
+           the followers who followed `feed_max_authors` authors after
+           this one do not get the posts."""
+        max_followers = settings.timeline_celebrity_followers
+        newer = aliased(Follow, name='newer')
+        followed_later = (
+            select(newer.id)
+            .where(newer.follower_id == Follow.follower_id,
+                   newer.id > Follow.id)
+            .offset(settings.feed_max_authors - 1)
+            .limit(1)
+            .exists())
+        followers = (await session.execute(
+            select(Follow.follower_id, followed_later)
+            .where(Follow.author_id == author_id)
+            .limit(max_followers + 1))).all()
+        if len(followers) > max_followers:
+            return []
+        return [follower_id for follower_id, capped in followers
+                if not capped]
+
+    async def _build_timeline(
+        self, session: AsyncSession, user: User
+    ) -> None:
+        """Fills the timeline with the latest posts of the followed
+           authors except the celebrities."""
+        rows = await self.get_feed(
+            session, user, limit=self.timelines.max_length,
+            celebrities=False)
+        await self.timelines.set(
+            user.id, [self._timeline_key(row.created, row.id) for row in rows],
+            len(rows) == self.timelines.max_length)
+
+    async def get_timeline(
+        self,
+        session: AsyncSession,
+        user: User,
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> list[Row]:
+        """The page of `get_feed` read from the timeline of the user, which
+           is built on the first read, merged with the latest posts of the
+           followed celebrities. Without timelines or past the end of
+           a truncated timeline it is `get_feed`."""
+        if self.timelines is None:
+            return await self.get_feed(
+                session, user, limit=limit, cursor=cursor)
+        after = None if cursor is None else self._timeline_key(
+            *self.decode_feed_cursor(cursor))
+        page = await self.timelines.get(user.id, after, limit)
+        if page is None:
+            await self._build_timeline(session, user)
+            page = await self.timelines.get(user.id, after, limit)
+        keys, truncated = page
+        if truncated and (limit is None or len(keys) < limit):
+            return await self.get_feed(
+                session, user, limit=limit, cursor=cursor)
+        rows = []
+        if keys:
+            rows = await self._merge_counters(session, (await session.execute(
+                self._select(projection=True)
+                .where(Post.id.in_([pk for _, pk in keys])))).all())
+        # Posts of the authors who became celebrities may be in both
+        rows = {row.id: row for row in rows}
+        for row in await self.get_feed(
+                session, user, limit=limit, cursor=cursor, celebrities=True):
+            rows.setdefault(row.id, row)
+        return sorted(
+            rows.values(), key=lambda row: (-row.created.timestamp(), row.id)
+        )[:limit]
+
+# === Create, Update, Delete ===
+    async def create(
+        self, session: AsyncSession, payload: PostCreate, **kwargs
+    ) -> Post:
+        search_backend = self.get_search_backend(session, required=False)
+        post = await super().create(session, payload, **kwargs)
+        await search_backend.index(session, post)
+        if self.timelines is not None:
+            await self.timelines.push(
+                await self._timeline_followers(session, post.author_id),
+                self._timeline_key(post.created, post.id))
+        return post
+
+    async def bulk_create(
+        self,
+        session: AsyncSession,
+        payloads: Sequence[PostCreate],
+        *,
+        user: User | None = None,
+        **kwargs,
+    ) -> list[int]:
+        """Imported posts are not fanned out: the timelines of the
+           followers of the importer are rebuilt on the next read."""
+        conflicts = await super().bulk_create(
+            session, payloads, user=user, **kwargs)
+        if user is not None and len(conflicts) < len(payloads):
+            await self.invalidate_author_timelines(session, user.id)
+        return conflicts
+
+    async def update(
+        self, session: AsyncSession, pk: int, payload: PostUpdate, **kwargs
+    ) -> Post:
+        search_backend = self.get_search_backend(session, required=False)
+        post = await super().update(session, pk, payload, **kwargs)
+        await search_backend.index(session, post)
+        # `UPDATE ... RETURNING` reloads the counters without the deltas
+        await self._merge_counters(session, [post])
+        return post
+
+    async def delete(
+        self, session: AsyncSession, pk: int, user: User | None = None
+    ) -> Post:
+        search_backend = self.get_search_backend(session, required=False)
+        # The counter shards are deleted with the post
+        deltas = await self._counter_deltas(session, [pk])
+        post = await super().delete(session, pk, user)
+        await self._merge_counters(session, [post], deltas)
+        await search_backend.remove(session, post.id)
+        if self.timelines is not None:
+            await self.timelines.remove(
+                await self._timeline_followers(session, post.author_id),
+                post.id)
+        return post
+
+# === LIKE/DISLIKE counters ===
+    @staticmethod
+    def _overlay_counters(
+        post: Post, source: str, likes: int, dislikes: int
+    ) -> None:
+        """Shows counter deltas not persisted in the post row yet without
+           marking the post dirty. Repeated overlays from the same source
+           replace each other, so reloaded posts are never counted twice."""
+        overlays = inspect(post).info.setdefault(COUNTER_OVERLAYS, {})
+        old_likes, old_dislikes = overlays.get(source, (0, 0))
+        overlays[source] = likes, dislikes
+        set_committed_value(
+            post, 'likes', (post.likes or 0) - old_likes + likes)
+        set_committed_value(
+            post, 'dislikes', (post.dislikes or 0) - old_dislikes + dislikes)
+
+    @staticmethod
+    def _add_counters(row: Row, deltas: list[tuple[int, int]]) -> tuple:
+        """Returns a copy of the projection row with deltas added."""
+        return _row_type(row._fields)(*row)._replace(
+            likes=row.likes + sum(likes for likes, _ in deltas),
+            dislikes=row.dislikes + sum(dislikes for _, dislikes in deltas))
+
+    async def _counter_deltas(
+        self, session: AsyncSession, post_ids: list[int]
+    ) -> dict[str, dict[int, tuple[int, int]]]:
+        """Deltas of the counter buffer and, in sharded mode, the sums of
+           the counter shards of the posts by source."""
+        sources = {}
+        if self.counter_buffer is not None:
+            sources[CounterBuffer.__name__] = {
+                post_id: self.counter_buffer.pending(post_id)
+                for post_id in post_ids}
+        if settings.like_counter_shards > 1 and post_ids:
+            sources[PostCounter.__tablename__] = {
+                post_id: (likes, dislikes)
+                for post_id, likes, dislikes in await session.execute(
+                    select(PostCounter.post_id,
+                           func.sum(PostCounter.likes),
+                           func.sum(PostCounter.dislikes))
+                    .where(PostCounter.post_id.in_(post_ids))
+                    .group_by(PostCounter.post_id))}
+        return sources
+
+    async def _merge_counters(
+        self,
+        session: AsyncSession,
+        posts: list[Post] | list[Row],
+        sources: dict[str, dict[int, tuple[int, int]]] | None = None,
+    ) -> list[Post] | list[tuple]:
+        """Adds the deltas of the counter buffer and, in sharded mode,
+           the sums of the counter shards to the posts or projection rows.
+           `sources` are the deltas read before, see `_counter_deltas`.
+        """
+        if sources is None:
+            sources = await self._counter_deltas(
+                session, [post.id for post in posts])
+        if not sources or not posts:
+            return posts
+        if isinstance(posts[0], Row):
+            return [
+                self._add_counters(row, [
+                    deltas.get(row.id, (0, 0)) for deltas in sources.values()])
+                for row in posts]
+        for post in posts:
+            for source, deltas in sources.items():
+                self._overlay_counters(
+                    post, source, *deltas.get(post.id, (0, 0)))
+        return posts
+
+    async def _increment_counter_shard(
+        self, session: AsyncSession, post_id: int, likes: int, dislikes: int
+    ) -> None:
+        """Spreads writes to a hot post over `like_counter_shards` rows."""
+        insert = dialect_insert(session, PostCounter).values(
+            post_id=post_id,
+            shard=random.randrange(settings.like_counter_shards),
+            likes=likes,
+            dislikes=dislikes)
+        excluded = insert.excluded
+        await session.execute(insert.on_conflict_do_update(
+            index_elements=(PostCounter.post_id, PostCounter.shard),
+            set_={'likes': PostCounter.likes + excluded.likes,
+                  'dislikes': PostCounter.dislikes + excluded.dislikes}))
+
+    async def _increment_counters(
+        self,
+        session: AsyncSession,
+        post_id: int,
+        user: User,
+        likes: int,
+        dislikes: int,
+    ) -> Post | None:
+        """Atomic `UPDATE ... RETURNING` of the post counters,
+           returns None if there is no such post or it is the user's one."""
+        posts = await session.scalars(
+            update(Post)
+            .where(Post.id == post_id, Post.author_id != user.id)
+            .values(likes=Post.likes + likes,
+                    dislikes=Post.dislikes + dislikes,
+                    rating=Post.rating + likes - dislikes)
+            .returning(Post))
+        return posts.first()
+
+    async def fold_counter_shards(self, session: AsyncSession) -> None:
+        """Moves the counter shards sums into the post rows,
+           run it before switching the sharded mode off."""
+        def shards_sum(column):
+            return select(func.coalesce(func.sum(column), 0)).where(
+                PostCounter.post_id == Post.id).scalar_subquery()
+
+        await session.execute(
+            update(Post)
+            .where(Post.id.in_(select(PostCounter.post_id)))
+            .values(likes=Post.likes + shards_sum(PostCounter.likes),
+                    dislikes=Post.dislikes + shards_sum(PostCounter.dislikes),
+                    rating=Post.rating + shards_sum(
+                        PostCounter.likes - PostCounter.dislikes))
+            .execution_options(synchronize_session=False))
+        await session.execute(delete(PostCounter))
+        await session.commit()
+
+    async def _react(
+        self,
+        session: AsyncSession,
+        post_id: int,
+        user: User,
+        like: bool,
+        prior: bool | None,
+    ) -> bool:
+        """Upserts the user reaction unless it was changed concurrently
+           since `prior` was read. Returns True if the reaction was written.
+        """
+        insert = dialect_insert(session, Reaction).values(
+            user_id=user.id, post_id=post_id, is_like=like)
+        conflict = (Reaction.user_id, Reaction.post_id)
+        insert = (
+            insert.on_conflict_do_nothing(index_elements=conflict)
+            if prior is None else
+            insert.on_conflict_do_update(
+                index_elements=conflict,
+                set_={'is_like': insert.excluded.is_like},
+                where=Reaction.is_like == prior))
+        written = await session.scalars(insert.returning(Reaction.id))
+        return written.first() is not None
 
     async def like_dislike_post(
         self,
@@ -58,15 +645,47 @@ class PostCRUD(CRUDBase[Post, PostCreate, PostUpdate]):
         user: User,
         like: bool = True,
     ) -> Post | None:
-        post: Post = await self.get_or_404(session, post_id)
+        """Sets LIKE/DISLIKE of the user to the post.
+           Repeating the current reaction of the user writes nothing."""
+        row = (await session.execute(
+            select(Post, Reaction.is_like)
+            .outerjoin(Reaction, and_(Reaction.post_id == Post.id,
+                                      Reaction.user_id == user.id))
+            .where(Post.id == post_id))).first()
+        if row is None:
+            raise HTTPException(HTTPStatus.NOT_FOUND, self.NOT_FOUND)
+        post, prior = row
         if post.author_id == user.id:
             raise HTTPException(
                 HTTPStatus.BAD_REQUEST, self.SELF_LIKE_DISLIKE_DENIED)
-        if like:
-            post.likes += 1
+        if prior is like or not await self._react(
+                session, post_id, user, like, prior):
+            await self._merge_counters(session, [post])
+            return post
+        likes = int(like) - int(prior is True)
+        dislikes = int(not like) - int(prior is False)
+        if self.counter_buffer is not None:
+            await session.commit()
+            self.counter_buffer.add(post_id, likes, dislikes)
+        elif settings.like_counter_shards > 1:
+            await self._increment_counter_shard(
+                session, post_id, likes, dislikes)
+            await session.commit()
         else:
-            post.dislikes += 1
-        return await self._save(session, post)
+            await self._increment_counters(
+                session, post_id, user, likes, dislikes)
+            await session.commit()
+        await self.invalidate(post_id)
+        await self._merge_counters(session, [post])
+        return post
 
 
-post_crud = PostCRUD(Post)
+post_crud = PostCRUD(Post, LRUCache(settings.cache_max_size))
+if settings.counter_buffer_enabled:
+    post_crud.counter_buffer = CounterBuffer(
+        AsyncSessionLocal,
+        settings.counter_buffer_flush_ms,
+        settings.counter_buffer_flush_events)
+if settings.timeline_enabled:
+    post_crud.timelines = MemoryTimelines(
+        settings.timeline_max_length, settings.timeline_max_users)
@@ -0,0 +1,125 @@
+"""Ranking of the top feed. The hot scores are recomputed by the
+application, unless `ranking_in_app` is off, or by a single process
+for all the workers:
+
+    python -m app.crud.ranking
+"""
+import asyncio
+import logging
+from datetime import datetime as dt
+from datetime import timedelta
+from typing import Callable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import settings
+from app.core.db import AsyncSessionLocal, engine
+from app.models import Post, PostCounter
+
+logger = logging.getLogger(__name__)
+
+
+def current_rating():
+    """`Post.rating` with the counter shards, which are not folded into
+       it until `fold_counter_shards`, added in the sharded mode."""
+    if settings.like_counter_shards <= 1:
+        return Post.rating
+    return Post.rating + select(
+        func.coalesce(func.sum(PostCounter.likes - PostCounter.dislikes), 0)
+    ).where(PostCounter.post_id == Post.id).scalar_subquery()
+
+
+class HotRanking:
+    """Periodic recompute of the time-decayed `Post.hot` scores
+       `rating / (age_hours + 2) ** gravity` read by the top feed.
+
+    `Post.rating` itself is kept up to date by `like_dislike_post`,
+    the decay only depends on time, so the scores are recomputed
+    every `interval_seconds` for the posts of the last `window_days`,
+    older posts drop to zero.
+    """
+    BATCH_SIZE = 1000
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        interval_seconds: float,
+        gravity: float,
+        window_days: float,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval_seconds
+        self.gravity = gravity
+        self.window = timedelta(days=window_days)
+        self._task: asyncio.Task | None = None
+
+    def score(self, rating: int, created: dt, now: dt) -> float:
+        age_hours = max((now - created).total_seconds() / 3600, 0)
+        return rating / (age_hours + 2) ** self.gravity
+
+    async def recompute(self, now: dt | None = None) -> int:
+        """Returns the number of the rescored posts of the window."""
+        now = now or dt.now()
+        since = now - self.window
+        rescored, last_id = 0, 0
+        async with self.session_factory() as session:
+            await session.execute(
+                update(Post)
+                .where(Post.created < since, Post.hot != 0)
+                .values(hot=0)
+                .execution_options(synchronize_session=False))
+            await session.commit()
+            while True:
+                rows = (await session.execute(
+                    select(Post.id, current_rating(), Post.created)
+                    .where(Post.created >= since, Post.id > last_id)
+                    .order_by(Post.id)
+                    .limit(self.BATCH_SIZE))).all()
+                if not rows:
+                    return rescored
+                await session.execute(update(Post), [
+                    {'id': pk, 'hot': self.score(rating, created, now)}
+                    for pk, rating, created in rows])
+                await session.commit()
+                rescored += len(rows)
+                last_id = rows[-1][0]
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.recompute()
+            except Exception:
+                logger.exception('Hot scores recompute failed.')
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+hot_ranking = HotRanking(
+    AsyncSessionLocal,
+    settings.ranking_interval_seconds,
+    settings.ranking_gravity,
+    settings.ranking_window_days)
+
+
+async def main() -> None:
+    """Recomputes the scores once if the interval is 0, e.g. by cron."""
+    try:
+        if hot_ranking.interval > 0:
+            await hot_ranking.run()
+        else:
+            await hot_ranking.recompute()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
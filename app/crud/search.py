@@ -0,0 +1,66 @@
+"""Full-text search backends of the posts."""
+from sqlalchemy import Subquery, column, func, literal_column, select, table
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Post
+
+
+class SearchBackend:
+    """Full-text index of the posts. `matches` returns a subquery of
+       `post_id` and `rank` columns, a higher rank is a better match.
+       The database backends are kept in sync by the database itself,
+       external ones should implement `index` and `remove` called by
+       `PostCRUD` on create, update and delete."""
+
+    def matches(self, query: str) -> Subquery:
+        raise NotImplementedError('matches() must be implemented.')
+
+    async def index(self, session: AsyncSession, post: Post) -> None:
+        pass
+
+    async def remove(self, session: AsyncSession, post_id: int) -> None:
+        pass
+
+
+class SQLiteSearch(SearchBackend):
+    """FTS5 table `post_fts` ranked by bm25, title matches weigh more."""
+    fts = table('post_fts', column('rowid'))
+    weights = (2.0, 1.0)
+
+    @staticmethod
+    def fts_query(query: str) -> str:
+        """Every word is quoted to be searched as is, not as FTS5 syntax."""
+        return ' '.join(
+            '"{}"'.format(word.replace('"', '""')) for word in query.split())
+
+    def matches(self, query: str) -> Subquery:
+        fts_table = literal_column(self.fts.name)
+        return (
+            select(self.fts.c.rowid.label('post_id'),
+                   (-func.bm25(fts_table, *self.weights)).label('rank'))
+            .where(fts_table.op('MATCH')(self.fts_query(query)))
+            .subquery())
+
+
+class PostgresSearch(SearchBackend):
+    """Generated `search_vector` column ranked by ts_rank,
+       the query is parsed by websearch_to_tsquery."""
+    config = 'simple'
+    post = table('post', column('id'), column('search_vector', TSVECTOR))
+
+    def matches(self, query: str) -> Subquery:
+        ts_query = func.websearch_to_tsquery(
+            literal_column(f"'{self.config}'::regconfig"), query)
+        return (
+            select(self.post.c.id.label('post_id'),
+                   func.ts_rank(self.post.c.search_vector, ts_query)
+                   .label('rank'))
+            .where(self.post.c.search_vector.op('@@')(ts_query))
+            .subquery())
+
+
+DIALECT_SEARCH_BACKENDS = {
+    'sqlite': SQLiteSearch(),
+    'postgresql': PostgresSearch(),
+}
@@ -1,7 +1,11 @@
 from fastapi import FastAPI
 
 from app.api import main_router
-from app.core import create_admin, settings
+from app.core import settings
+from app.core.replica import replica_router
+from app.core.request_stats import RequestStatsMiddleware
+from app.crud.post import post_crud
+from app.crud.ranking import hot_ranking
 
 app = FastAPI(
     title=settings.app_title,
@@ -9,8 +13,20 @@ app = FastAPI(
 )
 
 app.include_router(main_router)
+app.add_middleware(RequestStatsMiddleware)
 
 
 @app.on_event('startup')
 async def startup():
-    await create_admin()
+    if post_crud.counter_buffer is not None:
+        post_crud.counter_buffer.start()
+    if settings.ranking_in_app:
+        hot_ranking.start()
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    await hot_ranking.stop()
+    if post_crud.counter_buffer is not None:
+        await post_crud.counter_buffer.stop()
+    await replica_router.dispose()
@@ -1,2 +1,5 @@
+from .follow import Follow  # noqa
 from .post import Post  # noqa
-from .user import User  # noqa
\ No newline at end of file
+from .post_counter import PostCounter  # noqa
+from .reaction import Reaction  # noqa
+from .user import User  # noqa
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer, UniqueConstraint
+
+from app.core import Base
+
+
+class Follow(Base):
+    """Subscription of the follower to the posts of the author."""
+    # The followed authors of the user, see `PostCRUD.get_feed`
+    __table_args__ = (UniqueConstraint('follower_id', 'author_id'),)
+
+    follower_id = Column(
+        Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    author_id = Column(
+        Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+
+
+# The followers of the author
+Index('ix_follow_author_id_follower_id', Follow.author_id, Follow.follower_id)
@@ -1,6 +1,7 @@
 from datetime import datetime as dt
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, orm
+from sqlalchemy import (DDL, Column, DateTime, Float, ForeignKey, Index,
+                        Integer, String, Text, event, orm)
 
 from app.core import Base
 
@@ -12,6 +13,9 @@ class Post(Base):
     updated = Column(DateTime)
     likes = Column(Integer, default=0)
     dislikes = Column(Integer, default=0)
+    # likes - dislikes, see `app.crud.ranking`
+    rating = Column(Integer, default=0, server_default='0', nullable=False)
+    hot = Column(Float, default=0, server_default='0', nullable=False)
     author_id = Column(Integer, ForeignKey('user.id'), nullable=False)
     author = orm.relationship('User', lazy='joined')
 
@@ -25,3 +29,50 @@ class Post(Base):
             f'\ndislikes: {self.dislikes},'
             f'\nauthor: {self.author}.\n'
         )
+
+
+# Author's posts and the chronological feed, `id` breaks the ties of `created`
+Index('ix_post_author_id_created_id',
+      Post.author_id, Post.created.desc(), Post.id)
+Index('ix_post_created_id', Post.created.desc(), Post.id)
+# Top feeds
+Index('ix_post_rating_id', Post.rating.desc(), Post.id)
+Index('ix_post_hot_id', Post.hot.desc(), Post.id)
+
+
+# Full-text search index of title and content, see `app.crud.search`.
+# SQLite: FTS5 table over the post rows kept in sync by triggers,
+# PostgreSQL: generated tsvector column with GIN index.
+SEARCH_DDL = {
+    'sqlite': (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+        "title, content, content='post', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS post_fts_insert AFTER INSERT ON post "
+        "BEGIN INSERT INTO post_fts(rowid, title, content) "
+        "VALUES (new.id, new.title, new.content); END",
+        "CREATE TRIGGER IF NOT EXISTS post_fts_delete AFTER DELETE ON post "
+        "BEGIN INSERT INTO post_fts(post_fts, rowid, title, content) "
+        "VALUES ('delete', old.id, old.title, old.content); END",
+        "CREATE TRIGGER IF NOT EXISTS post_fts_update "
+        "AFTER UPDATE OF title, content ON post "
+        "BEGIN INSERT INTO post_fts(post_fts, rowid, title, content) "
+        "VALUES ('delete', old.id, old.title, old.content); "
+        "INSERT INTO post_fts(rowid, title, content) "
+        "VALUES (new.id, new.title, new.content); END",
+    ),
+    'postgresql': (
+        "ALTER TABLE post ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', title), 'A') || "
+        "setweight(to_tsvector('simple', content), 'B')) STORED",
+        "CREATE INDEX ix_post_search_vector ON post "
+        "USING gin (search_vector)",
+    ),
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Post.__table__, 'after_create',
+                     DDL(statement).execute_if(dialect=dialect))
+event.listen(Post.__table__, 'before_drop',
+             DDL('DROP TABLE IF EXISTS post_fts').execute_if(dialect='sqlite'))
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, ForeignKey, Integer, UniqueConstraint
+
+from app.core import Base
+
+
+class PostCounter(Base):
+    """Shard of the post LIKE/DISLIKE counters,
+       the totals are the sums over all shards of the post."""
+    __tablename__ = 'post_counter'
+    __table_args__ = (UniqueConstraint('post_id', 'shard'),)
+
+    post_id = Column(
+        Integer, ForeignKey('post.id', ondelete='CASCADE'), nullable=False)
+    shard = Column(Integer, nullable=False)
+    likes = Column(Integer, nullable=False, default=0)
+    dislikes = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,14 @@
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, UniqueConstraint
+
+from app.core import Base
+
+
+class Reaction(Base):
+    """LIKE (`is_like=True`) or DISLIKE of the post by the user."""
+    __table_args__ = (UniqueConstraint('user_id', 'post_id'),)
+
+    user_id = Column(
+        Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    post_id = Column(
+        Integer, ForeignKey('post.id', ondelete='CASCADE'), nullable=False)
+    is_like = Column(Boolean, nullable=False)
@@ -1,7 +1,10 @@
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTable
+from sqlalchemy import Column, Integer
 
 from app.core.db import Base
 
 
 class User(SQLAlchemyBaseUserTable[int], Base):
-    pass
+    # Maintained by `FollowCRUD`, see `PostCRUD.get_timeline`
+    followers = Column(
+        Integer, default=0, server_default='0', nullable=False)
@@ -1,2 +1,3 @@
-from .post import PostCreate, PostResponse, PostUpdate  # noqa
+from .post import (PostCreate, PostImportError, PostImportResult,  # noqa
+                   PostResponse, PostUpdate)
 from .user import UserCreate, UserRead, UserUpdate  # noqa
\ No newline at end of file
@@ -39,3 +39,13 @@ class PostResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class PostImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class PostImportResult(BaseModel):
+    created: int
+    errors: list[PostImportError]
@@ -0,0 +1,70 @@
+"""Fast JSON serialization of `PostResponse` bypassing pydantic.
+
+The output is byte-for-byte equal to the one FastAPI produces for
+`response_model=PostResponse, response_model_exclude_none=True`.
+"""
+import csv
+import io
+from datetime import datetime as dt
+from typing import Iterable, Sequence
+
+import orjson
+
+from app.core.request_stats import timed_serialization
+from app.models import Post
+
+POST_FIELDS = (
+    'id', 'title', 'content', 'created', 'updated', 'likes', 'dislikes')
+AUTHOR_FIELDS = ('id', 'email', 'is_active', 'is_superuser', 'is_verified')
+CSV_HEADER = POST_FIELDS + tuple(f'author_{field}' for field in AUTHOR_FIELDS)
+
+PostRow = Sequence
+
+
+def post_row(post: Post) -> tuple:
+    """Returns the values of `POST_FIELDS` and `AUTHOR_FIELDS` of the post.
+    """
+    author = post.author
+    return (
+        post.id, post.title, post.content, post.created, post.updated,
+        post.likes, post.dislikes,
+        author.id, author.email, author.is_active, author.is_superuser,
+        author.is_verified)
+
+
+def _post_dict(row: PostRow) -> dict:
+    post = {key: value for key, value in zip(POST_FIELDS, row)
+            if value is not None}
+    post['author'] = dict(zip(AUTHOR_FIELDS, row[len(POST_FIELDS):]))
+    return post
+
+
+@timed_serialization
+def dumps_post(row: PostRow) -> bytes:
+    return orjson.dumps(_post_dict(row))
+
+
+@timed_serialization
+def dumps_posts(rows: Iterable[PostRow]) -> bytes:
+    return orjson.dumps([_post_dict(row) for row in rows])
+
+
+@timed_serialization
+def dumps_posts_ndjson(rows: Iterable[PostRow]) -> bytes:
+    return b''.join(
+        orjson.dumps(_post_dict(row), option=orjson.OPT_APPEND_NEWLINE)
+        for row in rows)
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, dt) else value
+
+
+@timed_serialization
+def dumps_posts_csv(rows: Iterable[PostRow], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_HEADER)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
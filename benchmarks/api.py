@@ -0,0 +1,250 @@
+"""Load test of the post API.
+
+Seeds `--users` users and `--posts` posts, then drives the application
+in-process through httpx with `--concurrency` concurrent clients and
+reports throughput and p50/p95/p99 latency of the list, detail, create,
+update, like and auth flows. SQLite in a temporary directory is used
+unless `--database-url` is given, e.g. a scratch PostgreSQL database:
+the application tables of that database are dropped and recreated.
+
+Results are saved as JSON by `--output`. With `--baseline` the run
+fails if p95 latency grows or throughput drops by more than
+`--threshold` against the baseline results.
+
+Run: python -m benchmarks.api [--requests 200] [--output results.json]
+                              [--baseline old.json] [--threshold 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime as dt
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+
+FLOWS = ('list', 'detail', 'create', 'update', 'like', 'auth')
+PASSWORD = 'benchmark'
+POST_CHUNK = 1000
+
+
+def email(user_id: int) -> str:
+    return f'user{user_id}@example.com'
+
+
+async def seed(users: int, posts: int, rng: random.Random) -> list[int]:
+    """Returns the author ids of the posts, post ids start from 1."""
+    from sqlalchemy import insert
+
+    from app.core.db import AsyncSessionLocal, Base, engine
+    from app.core.password import CONTEXT
+    from app.models import Post, User
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    hashed_password = CONTEXT.hash(PASSWORD)
+    authors = [rng.randint(1, users) for _ in range(posts)]
+    now = dt.now()
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(User), [
+            {'email': email(user_id), 'hashed_password': hashed_password,
+             'is_active': True, 'is_superuser': False, 'is_verified': False}
+            for user_id in range(1, users + 1)])
+        for start in range(0, posts, POST_CHUNK):
+            await session.execute(insert(Post), [
+                {'title': f'Post {i}', 'content': f'Content of the post {i}.',
+                 'author_id': authors[i], 'likes': 0, 'dislikes': 0,
+                 'created': now - timedelta(minutes=posts - i)}
+                for i in range(start, min(start + POST_CHUNK, posts))])
+        await session.commit()
+    return authors
+
+
+class Flows:
+    """Requests of the measured flows, `i` is the number of the request."""
+
+    def __init__(self, authors: list[int], users: int, rng: random.Random,
+                 tokens: dict[int, dict[str, str]]) -> None:
+        self.authors = authors
+        self.users = users
+        self.rng = rng
+        self.tokens = tokens
+
+    def random_post(self) -> int:
+        return self.rng.randint(1, len(self.authors))
+
+    def list(self, client: httpx.AsyncClient, i: int):
+        from app.crud.pagination import encode_cursor
+        params = {'limit': 20}
+        if i % 2:
+            params['cursor'] = encode_cursor(self.random_post())
+        return client.get('/post/', params=params)
+
+    def detail(self, client: httpx.AsyncClient, i: int):
+        return client.get(f'/post/{self.random_post()}')
+
+    def create(self, client: httpx.AsyncClient, i: int):
+        user_id = self.rng.randint(1, self.users)
+        return client.post('/post/', headers=self.tokens[user_id], json={
+            'title': f'New post {uuid4().hex}', 'content': 'New content.'})
+
+    def update(self, client: httpx.AsyncClient, i: int):
+        post_id = self.random_post()
+        return client.put(
+            f'/post/{post_id}', headers=self.tokens[self.authors[post_id - 1]],
+            json={'title': f'Updated post {uuid4().hex}'})
+
+    def like(self, client: httpx.AsyncClient, i: int):
+        post_id = self.random_post()
+        user_id = self.rng.choice([
+            user_id for user_id in range(1, self.users + 1)
+            if user_id != self.authors[post_id - 1]])
+        return client.get(
+            f'/post/like/{post_id}', headers=self.tokens[user_id])
+
+    def auth(self, client: httpx.AsyncClient, i: int):
+        return client.post('/auth/jwt/login', data={
+            'username': email(self.rng.randint(1, self.users)),
+            'password': PASSWORD})
+
+
+def percentile(quantiles: list[float], percent: int) -> float:
+    return quantiles[percent - 1] * 1000
+
+
+async def measure(client, request, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    numbers = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in numbers:
+            start = time.perf_counter()
+            response = await request(client, i)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': requests,
+        'errors': errors,
+        'rps': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(quantiles, 50), 2),
+        'p95_ms': round(percentile(quantiles, 95), 2),
+        'p99_ms': round(percentile(quantiles, 99), 2),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from app.core.user import get_jwt_strategy
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    authors = await seed(args.users, args.posts, rng)
+    strategy = get_jwt_strategy()
+    tokens = {
+        user_id: {'Authorization': 'Bearer ' + await strategy.write_token(
+            SimpleNamespace(id=user_id))}
+        for user_id in range(1, args.users + 1)}
+    flows = Flows(authors, args.users, rng, tokens)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+            transport=transport, base_url='http://benchmark') as client:
+        for name in args.flows:
+            # bcrypt makes a login orders of magnitude slower.
+            requests = (max(args.requests // 10, args.concurrency)
+                        if name == 'auth' else args.requests)
+            results[name] = await measure(
+                client, getattr(flows, name), requests, args.concurrency)
+            result = results[name]
+            print(f'{name:<8}{result["rps"]:>10.1f} req/s'
+                  f'{result["p50_ms"]:>10.1f} ms p50'
+                  f'{result["p95_ms"]:>10.1f} ms p95'
+                  f'{result["p99_ms"]:>10.1f} ms p99'
+                  f'{result["errors"]:>6} errors')
+    return results
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list:
+    found = []
+    for name, result in results.items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        if result['p95_ms'] > old['p95_ms'] * (1 + threshold):
+            found.append(
+                f'{name}: p95 {old["p95_ms"]} -> {result["p95_ms"]} ms')
+        if result['rps'] < old['rps'] * (1 - threshold):
+            found.append(f'{name}: rps {old["rps"]} -> {result["rps"]}')
+    return found
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--flows', nargs='+', default=list(FLOWS), choices=FLOWS)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--baseline', type=Path)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.users < 2:
+        sys.exit('Likes need at least 2 users.')
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or (
+            f'sqlite+aiosqlite:///{Path(tmp) / "benchmark.db"}')
+        # The application reads the settings on import.
+        os.environ.update(
+            DATABASE_URL=database_url, QUERY_BUDGET='0',
+            RANKING_INTERVAL_SECONDS='0')
+        print(f'{args.users} users, {args.posts} posts, '
+              f'concurrency {args.concurrency}')
+        results = asyncio.run(run(args))
+    report = {
+        'meta': {
+            'date': dt.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': database_url.split(':', 1)[0],
+            **{key: getattr(args, key) for key in (
+                'users', 'posts', 'requests', 'concurrency', 'seed')},
+        },
+        'results': results,
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.baseline is not None:
+        found = regressions(
+            results, json.loads(args.baseline.read_text()), args.threshold)
+        for regression in found:
+            print(f'REGRESSION {regression}')
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Micro-benchmark of single object lookups in CRUDBase.
+
+Compares fetching every matching row and keeping the first one
+with `LIMIT 1` and with the identity map of the session.
+
+Run: python -m benchmarks.crud_get [posts] [iterations]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.crud.base import CRUDBase
+from app.models import Post, User
+
+
+class Counter:
+    def __init__(self, engine):
+        self.statements = 0
+        self.rows = 0
+        event.listen(engine.sync_engine, 'after_cursor_execute', self.count)
+
+    def count(self, conn, cursor, statement, *args):
+        self.statements += 1
+
+    def reset(self):
+        self.statements = self.rows = 0
+
+
+async def seed(session, posts: int) -> None:
+    session.add(User(email='author@example.com', hashed_password='-'))
+    await session.commit()
+    session.add_all(
+        Post(title=f'title {i}', content='content', author_id=1)
+        for i in range(posts))
+    await session.commit()
+
+
+async def timeit(counter, name, iterations, lookup):
+    counter.reset()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        counter.rows += await lookup()
+    elapsed = (time.perf_counter() - start) / iterations * 1e6
+    print(f'{name:<28}{elapsed:>10.1f} us'
+          f'{counter.statements / iterations:>8.2f} stmt'
+          f'{counter.rows / iterations:>10.1f} rows')
+
+
+async def main(posts: int = 1000, iterations: int = 200) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        crud = CRUDBase(Post)
+        counter = Counter(engine)
+        async with session_factory() as session:
+            await seed(session, posts)
+            query = select(Post).where(Post.author_id == 1).order_by(Post.id)
+
+            async def first_of_all():
+                return len((await session.scalars(query)).all())
+
+            async def first_with_limit():
+                return int(await crud.get_by_attr(
+                    session, 'author_id', 1) is not None)
+
+            async def get_by_pk():
+                return int(await crud.get(session, posts) is not None)
+
+            # The identity map holds weak references: keep the object alive.
+            loaded = await crud.get(session, posts)  # noqa: F841
+
+            print(f'{posts} matching rows, {iterations} iterations')
+            await timeit(counter, 'get_by_attr, all rows',
+                         iterations, first_of_all)
+            await timeit(counter, 'get_by_attr, LIMIT 1',
+                         iterations, first_with_limit)
+            await timeit(counter, 'get, identity map',
+                         iterations, get_by_pk)
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*map(int, sys.argv[1:])))
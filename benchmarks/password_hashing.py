@@ -0,0 +1,64 @@
+"""Event loop lag during concurrent logins.
+
+Verifies bcrypt passwords concurrently, as a login storm does, while
+a probe task measures how late its 10 ms sleeps wake up. Compares
+verification on the event loop, as `PasswordHelper` does it, with
+`ExecutorPasswordHelper` in thread and process pools.
+
+Run: python -m benchmarks.password_hashing [logins] [workers]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from fastapi_users.password import PasswordHelper
+
+from app.core.password import CONTEXT, ExecutorPasswordHelper
+
+PROBE_INTERVAL = 0.01
+
+
+async def probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def run(name: str, verify, hashed: str, logins: int) -> None:
+    lags, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(verify('password', hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    lags.sort()
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(f'{name:<16}{logins / elapsed:>10.1f} logins/s'
+          f'{statistics.median(lags) * 1e3:>10.1f} ms p50 lag'
+          f'{p99 * 1e3:>10.1f} ms p99 lag'
+          f'{lags[-1] * 1e3:>10.1f} ms max lag')
+
+
+async def main(logins: int = 20, workers: int = 4) -> None:
+    hashed = CONTEXT.hash('password')
+    blocking = PasswordHelper(CONTEXT)
+
+    async def on_event_loop(plain: str, hashed: str):
+        return blocking.verify_and_update(plain, hashed)
+
+    print(f'{logins} concurrent logins, {workers} workers')
+    await run('event loop', on_event_loop, hashed, logins)
+    for pool in ('thread', 'process'):
+        helper = ExecutorPasswordHelper(pool, workers)
+        # Start the workers before measuring.
+        await helper.verify_and_update_async('password', hashed)
+        await run(f'{pool} pool', helper.verify_and_update_async,
+                  hashed, logins)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*map(int, sys.argv[1:])))
@@ -0,0 +1,88 @@
+"""Cold start of a worker: import of `app.main`, startup and first request.
+
+Every run is a fresh interpreter against a temporary SQLite database,
+as a new uvicorn worker is. The admin bootstrap is timed separately:
+creating the admin hashes the password, the following runs only check
+that the admin exists.
+
+Run: python -m benchmarks.startup [runs]
+"""
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+WORKER = '''
+import json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    started = time.perf_counter()
+    assert client.get('/post/').status_code == 200
+    responded = time.perf_counter()
+print(json.dumps({'import': imported - start, 'startup': started - imported,
+                  'first request': responded - started}))
+'''
+
+BOOTSTRAP = '''
+import asyncio, json, time
+from app.core.init_db import create_admin, engine
+
+async def main():
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        await create_admin()
+        timings.append(time.perf_counter() - start)
+    await engine.dispose()
+    print(json.dumps({'create admin': timings[0],
+                      'admin exists': min(timings[1:])}))
+
+asyncio.run(main())
+'''
+
+
+def run(code: str, env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-c', code], env=env, check=True,
+        capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+async def create_tables(database_url: str) -> None:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.core.db import Base
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+
+def main(runs: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        asyncio.run(create_tables(database_url))
+        env = {**os.environ, 'DATABASE_URL': database_url,
+               'ADMIN_EMAIL': 'admin@example.com', 'ADMIN_PASSWORD': 'admin',
+               'RANKING_INTERVAL_SECONDS': '0'}
+        start = time.perf_counter()
+        samples = [run(WORKER, env) for _ in range(runs)]
+        print(f'{runs} worker starts, {time.perf_counter() - start:.1f} s '
+              f'with the interpreter startup')
+        for name in samples[0]:
+            median = statistics.median(sample[name] for sample in samples)
+            print(f'{name:<16}{median * 1e3:>10.1f} ms')
+        for name, value in run(BOOTSTRAP, env).items():
+            print(f'{name:<16}{value * 1e3:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
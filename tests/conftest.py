@@ -2,6 +2,7 @@ from pathlib import Path
 
 import pytest
 import pytest_asyncio
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
 
 try:
@@ -12,7 +13,8 @@ except (NameError, ImportError):
         'Проверьте и поправьте: он должен быть доступен в модуле `app.main`.')
 
 try:
-    from app.core.db import Base, get_async_session
+    from app.core.db import Base, get_async_session, get_read_only_session, read_only_sessionmaker
+    from app.core.request_stats import observe_queries
 except (NameError, ImportError):
     raise AssertionError(
         'Не обнаружены объекты `Base, get_async_session`. '
@@ -28,7 +30,7 @@ except (NameError, ImportError):
         '`app.code.init_db`')
 
 try:
-    from app.core.user import current_user
+    from app.core.user import current_superuser, current_user, user_cache
 except (NameError, ImportError):
     raise AssertionError(
         'Не обнаружен объект `current_user`.'
@@ -72,7 +74,7 @@ except (NameError, ImportError):
         'Не найден объект `Post`. Он должен находиться в модуле `app.crud.post`')
 
 try:
-    from app.crud.post import PostCRUD  # noqa
+    from app.crud.post import PostCRUD, post_crud  # noqa
 except (NameError, ImportError):
     raise AssertionError(
         'Не найден объект `PostCRUD`. Он должен находиться в модуле `app.post.base`')
@@ -92,12 +94,31 @@ TestingSessionLocal = async_sessionmaker(expire_on_commit=False,
                                          bind=engine)
 
 
+TestingReadOnlySessionLocal = read_only_sessionmaker(engine)
+
+observe_queries(engine)
+
+
 async def override_get_async_session():
     async with TestingSessionLocal() as session:
         yield session
 
 
+async def override_get_read_only_session():
+    async with TestingReadOnlySessionLocal() as session:
+        yield session
+
+
 app.dependency_overrides[get_async_session] = override_get_async_session
+app.dependency_overrides[get_read_only_session] = override_get_read_only_session
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    post_crud.cache.clear()
+    user_cache.clear()
+    user_cache.invalidations.clear()
+    yield
 
 
 @pytest_asyncio.fixture(autouse=True)
@@ -115,6 +136,33 @@ async def get_test_session() -> AsyncSession:
         yield session
 
 
+@pytest.fixture
+def create_users(get_test_session):
+    """Returns a coroutine function saving `count` active users
+       `user{i}@example.com` and returning them."""
+    async def create_users(count: int) -> list[User]:
+        users = [User(email=f'user{i}@example.com', hashed_password='password', is_active=True,
+                      is_superuser=False, is_verified=False) for i in range(count)]
+        get_test_session.add_all(users)
+        await get_test_session.commit()
+        return users
+
+    return create_users
+
+
+@pytest.fixture
+def statements():
+    """SQL statements run by the test engine, clear it to skip the setup."""
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    yield statements
+    event.remove(engine.sync_engine, 'before_cursor_execute', collect)
+
+
 @pytest.fixture
 def superuser_client():
     app.dependency_overrides[current_user] = lambda: User(
@@ -127,6 +175,18 @@ def superuser_client():
     app.dependency_overrides[current_user] = current_user
 
 
+@pytest.fixture
+def superuser_only_client():
+    app.dependency_overrides[current_superuser] = lambda: User(
+        id=1,
+        is_active=True,
+        is_verified=True,
+        is_superuser=True,
+    )
+    yield
+    del app.dependency_overrides[current_superuser]
+
+
 @pytest.fixture
 def new_post():
     yield create_post()
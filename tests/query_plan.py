@@ -0,0 +1,95 @@
+"""Test mode helper catching queries which scan whole large tables.
+
+```py
+with QueryPlanChecker(engine, {'post'}) as checker:
+    await post_crud.get_all(session, limit=10)
+checker.assert_no_full_scans()
+```
+"""
+import json
+import re
+from typing import Iterable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+CHECKED_STATEMENTS = re.compile(r'^\s*(SELECT|UPDATE|DELETE|WITH)\b', re.I)
+LIMIT = re.compile(r'\bLIMIT\b', re.I)
+WHERE = re.compile(r'\bWHERE\b', re.I)
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+class QueryPlanChecker:
+    """Explains every statement executed by the engine while active and
+       collects the ones reading a whole table from `tables`.
+
+    SQLite: a `SCAN` is only allowed for an unfiltered statement with
+    `LIMIT` whose rows come in the requested order (no temp B-tree),
+    e.g. the first page of a list, as such a scan stops early.
+    PostgreSQL: sequential scans are disabled while explaining to see
+    the plan as for a large table, so any `Seq Scan` means that there
+    is no usable index.
+    """
+
+    def __init__(self, engine: AsyncEngine, tables: Iterable[str]) -> None:
+        self.engine = engine.sync_engine
+        self.tables = set(tables)
+        self.violations: list[tuple[str, list[str]]] = []
+
+    def __enter__(self) -> 'QueryPlanChecker':
+        event.listen(self.engine, 'before_cursor_execute', self._explain)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, 'before_cursor_execute', self._explain)
+
+    def _explain(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        if executemany or not CHECKED_STATEMENTS.match(statement):
+            return
+        explain_cursor = conn.connection.cursor()
+        try:
+            if conn.dialect.name == 'postgresql':
+                explain_cursor.execute('SET enable_seqscan = off')
+                try:
+                    explain_cursor.execute(
+                        f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+                    plan = explain_cursor.fetchone()[0]
+                finally:
+                    # The connection goes back to the pool
+                    explain_cursor.execute('RESET enable_seqscan')
+                scans = self._postgresql_scans(
+                    json.loads(plan) if isinstance(plan, str) else plan)
+            else:
+                explain_cursor.execute(
+                    f'EXPLAIN QUERY PLAN {statement}', parameters)
+                scans = self._sqlite_scans(
+                    statement, [row[-1] for row in explain_cursor.fetchall()])
+        finally:
+            explain_cursor.close()
+        if scans:
+            self.violations.append((statement, scans))
+
+    def _sqlite_scans(self, statement: str, plan: list[str]) -> list[str]:
+        if LIMIT.search(statement) and not WHERE.search(statement) and not any(
+                'TEMP B-TREE' in step for step in plan):
+            return []
+        return [step for step in plan
+                if (match := SQLITE_SCAN.match(step)) and
+                match.group(1) in self.tables]
+
+    def _postgresql_scans(self, plan) -> list[str]:
+        scans, nodes = [], [item['Plan'] for item in plan]
+        while nodes:
+            node = nodes.pop()
+            if (node['Node Type'] == 'Seq Scan' and
+                    node.get('Relation Name') in self.tables):
+                scans.append(f"Seq Scan on {node['Relation Name']}")
+            nodes.extend(node.get('Plans', ()))
+        return scans
+
+    def assert_no_full_scans(self) -> None:
+        assert not self.violations, '\n'.join(
+            f'{statement}\n    {scans}'
+            for statement, scans in self.violations)
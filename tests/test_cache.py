@@ -0,0 +1,87 @@
+import pytest
+
+from app.core.cache import LRUCache, RedisCache
+from app.crud.post import post_crud
+
+from .conftest import Post
+from .fixtures.data import AUTH_USER, ENDPOINT, ID, LIKE_ENDPOINT, POST_SAVE_DATA, PUT_PAYLOAD
+from .fixtures.endpoints_testlib import GET, assert_response, get_auth_user_token, get_headers
+from .utils import create_post
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.mark.anyio
+async def test_lru_cache(monkeypatch):
+    cache = LRUCache(max_size=2)
+    await cache.set('a', b'a', ttl=10)
+    await cache.set('b', b'b', ttl=10)
+    assert await cache.get('a') == b'a'
+    await cache.set('c', b'c', ttl=10)
+    assert await cache.get('b') is None
+    assert len(cache) == 2
+    await cache.delete('a')
+    assert await cache.get('a') is None
+    monkeypatch.setattr('app.core.cache.monotonic', lambda: 10**9)
+    assert await cache.get('c') is None
+
+
+@pytest.mark.parametrize('get_cache', (lambda: LRUCache(10), lambda: RedisCache(FakeRedis())))
+@pytest.mark.anyio
+async def test_get_serialized_or_404(get_test_session, monkeypatch, get_cache):
+    monkeypatch.setattr(post_crud, 'cache', get_cache())
+    calls = []
+
+    def serializer(post):
+        calls.append(post.id)
+        return post.title.encode()
+
+    await post_crud._save(get_test_session, Post(**POST_SAVE_DATA))
+    for _ in range(2):
+        assert await post_crud.get_serialized_or_404(get_test_session, 1, serializer) == POST_SAVE_DATA['title'].encode()
+    assert calls == [1]
+    await post_crud.invalidate(1)
+    await post_crud.get_serialized_or_404(get_test_session, 1, serializer)
+    assert calls == [1, 1]
+
+
+@pytest.mark.parametrize('invalidated, cached', ((1, False), (2, True)))
+@pytest.mark.anyio
+async def test_get_serialized_or_404_skips_cache_on_concurrent_write(get_test_session, monkeypatch,
+                                                                    invalidated, cached):
+    """The write happens in another worker sharing the cache backend."""
+    other_worker = type(post_crud)(Post, post_crud.cache)
+    await post_crud._save(get_test_session, Post(**POST_SAVE_DATA))
+    get_by_attr = post_crud.get_by_attr
+
+    async def write_meanwhile(*args, **kwargs):
+        await other_worker.invalidate(invalidated)
+        return await get_by_attr(*args, **kwargs)
+
+    monkeypatch.setattr(post_crud, 'get_by_attr', write_meanwhile)
+    await post_crud.get_serialized_or_404(get_test_session, 1, lambda post: b'')
+    assert (await post_crud.cache.get(post_crud._cache_key(1)) is not None) is cached
+
+
+def test_cache_invalidation_on_writes():
+    author_headers = create_post()
+    user_headers = get_headers(get_auth_user_token(AUTH_USER))
+    assert assert_response(200, GET, ENDPOINT, path_param=ID).json()['likes'] == 0
+    assert_response(200, GET, LIKE_ENDPOINT, path_param=ID, headers=user_headers)
+    assert assert_response(200, GET, ENDPOINT, path_param=ID).json()['likes'] == 1
+    assert_response(200, 'PUT', ENDPOINT, path_param=ID, headers=author_headers, json=PUT_PAYLOAD)
+    assert assert_response(200, GET, ENDPOINT, path_param=ID).json()['title'] == PUT_PAYLOAD['title']
+    assert_response(200, 'DELETE', ENDPOINT, path_param=ID, headers=author_headers)
+    assert_response(404, GET, ENDPOINT, path_param=ID)
@@ -1,11 +1,63 @@
 from typing import AsyncGenerator
 
 import pytest
+from sqlalchemy import event, select
 
-from .conftest import get_async_session
+from app.core import init_db
+from app.core.db import ReadOnlySession
+from app.core.password import password_helper
+
+from .conftest import (Post, TestingReadOnlySessionLocal, TestingSessionLocal, User,
+                       engine, get_async_session, get_read_only_session)
+from .fixtures.data import POST_SAVE_DATA
 
 
 @pytest.mark.anyio
 async def test_get_async_session():
     assert isinstance(get_async_session(), AsyncGenerator)
 
+
+
+@pytest.mark.anyio
+async def test_get_read_only_session():
+    assert isinstance(get_read_only_session(), AsyncGenerator)
+
+
+@pytest.mark.anyio
+async def test_read_only_session_releases_connection(get_test_session):
+    get_test_session.add(Post(**POST_SAVE_DATA))
+    await get_test_session.commit()
+    checkouts = []
+
+    def count(*args):
+        checkouts.append(args)
+
+    event.listen(engine.sync_engine, 'checkout', count)
+    try:
+        async with TestingReadOnlySessionLocal() as session:
+            assert isinstance(session, ReadOnlySession)
+            assert checkouts == []
+            post = (await session.scalars(select(Post))).first()
+            assert not session.in_transaction()
+            assert await session.get(Post, post.id) is post
+            assert not session.in_transaction()
+            assert post.title == POST_SAVE_DATA['title']
+    finally:
+        event.remove(engine.sync_engine, 'checkout', count)
+    assert len(checkouts) == 1
+
+
+@pytest.mark.anyio
+async def test_create_admin_is_idempotent(get_test_session, monkeypatch):
+    async def hash_async(password):
+        raise AssertionError('The password of an existing admin must not be hashed.')
+
+    monkeypatch.setattr(init_db, 'AsyncSessionLocal', TestingSessionLocal)
+    monkeypatch.setattr(init_db.settings, 'admin_email', 'admin@example.com')
+    monkeypatch.setattr(init_db.settings, 'admin_password', 'admin')
+    assert await init_db.create_admin() is True
+    monkeypatch.setattr(password_helper, 'hash_async', hash_async)
+    monkeypatch.setattr(init_db.settings, 'admin_email', 'ADMIN@example.com')
+    assert await init_db.create_admin() is False
+    [admin] = (await get_test_session.scalars(select(User))).all()
+    assert (admin.email, admin.is_superuser) == ('admin@example.com', True)
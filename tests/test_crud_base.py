@@ -145,4 +145,52 @@ async def test_func_raises_exceptions(get_crud_base, get_test_session, method_na
     # is allowed exception    
     with pytest.raises(NotImplementedError) as exc_info:
         await method(get_test_session, *args)
-    assert exc_info.value.args[0] == expected_msg
\ No newline at end of file
+    assert exc_info.value.args[0] == expected_msg
+
+@pytest.mark.anyio
+async def test_get_all_pagination(get_crud_base, get_test_session):
+    for i in range(3):
+        await get_crud_base._save(get_test_session, Post(**{**POST_SAVE_DATA, 'title': f'{i} {POST_SAVE_DATA["title"]}'}))
+    page = await get_crud_base.get_all(get_test_session, limit=2)
+    assert [post.id for post in page] == [1, 2]
+    cursor = get_crud_base.next_cursor(page, 2)
+    assert isinstance(cursor, str)
+    page = await get_crud_base.get_all(get_test_session, limit=2, cursor=cursor)
+    assert [post.id for post in page] == [3]
+    assert get_crud_base.next_cursor(page, 2) is None
+    assert get_crud_base.next_cursor(page, None) is None
+
+
+@pytest.mark.parametrize('cursor', ('-invalid-', 'W10', 'WyJhIl0'))
+@pytest.mark.anyio
+async def test_get_all_invalid_cursor(get_crud_base, get_test_session, cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        await get_crud_base.get_all(get_test_session, cursor=cursor)
+    _check_exc_info(exc_info, HTTPStatus.BAD_REQUEST, 'Invalid pagination cursor.')
+
+
+@pytest.mark.anyio
+async def test_projection_not_defined(get_crud_base, get_test_session):
+    with pytest.raises(NotImplementedError) as exc_info:
+        await get_crud_base.get_all(get_test_session, projection=True)
+    assert exc_info.value.args[0] == 'projection must be defined.'
+
+
+@pytest.mark.anyio
+async def test_get_by_attr_limits_to_one_row(get_crud_base, get_test_session, statements):
+    for _ in range(3):
+        await get_crud_base._save(get_test_session, Post(**{**POST_SAVE_DATA, 'title': f'{_} title'}))
+    statements.clear()
+    post = await get_crud_base.get_by_attr(get_test_session, 'content', POST_SAVE_DATA['content'])
+    assert post.id == 1
+    assert len(statements) == 1
+    assert 'LIMIT' in statements[0]
+
+
+@pytest.mark.anyio
+async def test_get_uses_identity_map(get_crud_base, get_test_session, statements):
+    post = await get_crud_base._save(get_test_session, Post(**POST_SAVE_DATA))
+    statements.clear()
+    assert await get_crud_base.get_or_404(get_test_session, 1) is post
+    assert await get_crud_base.get(get_test_session, 1) is post
+    assert statements == []
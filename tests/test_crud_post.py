@@ -0,0 +1,206 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.core import settings
+from app.crud.buffer import CounterBuffer
+from app.crud.post import post_crud
+from app.models import PostCounter, Reaction
+from app.schemas import PostCreate, PostUpdate
+from app.serializers.post import dumps_post, post_row
+
+from .conftest import Post, TestingSessionLocal, User
+from .fixtures.data import POST_SAVE_DATA
+
+
+async def _create_users_and_post(session, create_users, users: int = 3) -> list[User]:
+    users = await create_users(users)
+    await post_crud._save(session, Post(**POST_SAVE_DATA))
+    return users
+
+
+@pytest.mark.parametrize('shards', (1, 4))
+@pytest.mark.anyio
+async def test_like_dislike_post(get_test_session, create_users, monkeypatch, shards):
+    monkeypatch.setattr(settings, 'like_counter_shards', shards)
+    author, *users = await _create_users_and_post(get_test_session, create_users, 5)
+    for user in users:
+        post = await post_crud.like_dislike_post(get_test_session, 1, user)
+    post = await post_crud.like_dislike_post(get_test_session, 1, users[0], like=False)
+    assert (post.likes, post.dislikes) == (3, 1)
+    assert post.author.email == author.email
+    post = await post_crud.get_or_404(get_test_session, 1)
+    assert (post.likes, post.dislikes) == (3, 1)
+    [post] = await post_crud.get_all(get_test_session)
+    assert (post.likes, post.dislikes) == (3, 1)
+    assert not get_test_session.dirty
+    [row] = await post_crud.get_all(get_test_session, projection=True)
+    assert (row.likes, row.dislikes) == (3, 1)
+    row = await post_crud.get_by_attr(get_test_session, 'id', 1, projection=True)
+    assert (row.likes, row.dislikes) == (3, 1)
+
+
+@pytest.mark.parametrize('shards', (1, 4))
+@pytest.mark.anyio
+async def test_like_dislike_post_is_idempotent(get_test_session, create_users, monkeypatch, shards):
+    monkeypatch.setattr(settings, 'like_counter_shards', shards)
+    _, user = await _create_users_and_post(get_test_session, create_users, 2)
+    for like in (True, True, False, False, True):
+        post = await post_crud.like_dislike_post(get_test_session, 1, user, like)
+        assert (post.likes, post.dislikes) == (int(like), int(not like))
+    reactions = (await get_test_session.scalars(select(Reaction))).all()
+    assert [(r.user_id, r.post_id, r.is_like) for r in reactions] == [(user.id, 1, True)]
+
+
+@pytest.mark.parametrize('shards', (1, 4))
+@pytest.mark.parametrize('post_id, user_index, status, msg', (
+    (2, 1, HTTPStatus.NOT_FOUND, 'Пост(ы) не найден(ы).'),
+    (1, 0, HTTPStatus.BAD_REQUEST, 'Запрещено ставить LIKE/DISLIKE собственным постам.'),
+))
+@pytest.mark.anyio
+async def test_like_dislike_post_exceptions(get_test_session, create_users, monkeypatch, shards, post_id, user_index, status, msg):
+    monkeypatch.setattr(settings, 'like_counter_shards', shards)
+    users = await _create_users_and_post(get_test_session, create_users)
+    with pytest.raises(HTTPException) as exc_info:
+        await post_crud.like_dislike_post(get_test_session, post_id, users[user_index])
+    assert exc_info.value.args == (status, msg)
+
+
+@pytest.mark.anyio
+async def test_fold_counter_shards(get_test_session, create_users, monkeypatch):
+    monkeypatch.setattr(settings, 'like_counter_shards', 4)
+    _, *users = await _create_users_and_post(get_test_session, create_users, 4)
+    for user in users:
+        await post_crud.like_dislike_post(get_test_session, 1, user)
+    await post_crud.fold_counter_shards(get_test_session)
+    assert await get_test_session.scalar(select(func.count()).select_from(PostCounter)) == 0
+    monkeypatch.setattr(settings, 'like_counter_shards', 1)
+    get_test_session.expunge_all()
+    post = await post_crud.get_or_404(get_test_session, 1)
+    assert (post.likes, post.dislikes) == (3, 0)
+
+
+@pytest.fixture
+def counter_buffer(monkeypatch):
+    buffer = CounterBuffer(TestingSessionLocal, flush_interval_ms=10**6, flush_events=10**6)
+    monkeypatch.setattr(post_crud, 'counter_buffer', buffer)
+    yield buffer
+
+
+async def _stored_counters(post_id: int = 1) -> tuple[int, int]:
+    async with TestingSessionLocal() as session:
+        post = await session.get(Post, post_id)
+        return post.likes, post.dislikes
+
+
+@pytest.mark.anyio
+async def test_counter_buffer(get_test_session, create_users, counter_buffer):
+    _, *users = await _create_users_and_post(get_test_session, create_users, 4)
+    for user in users:
+        post = await post_crud.like_dislike_post(get_test_session, 1, user)
+    post = await post_crud.like_dislike_post(get_test_session, 1, users[0], like=False)
+    assert (post.likes, post.dislikes) == (2, 1)
+    assert await _stored_counters() == (0, 0)
+    get_test_session.expunge_all()
+    post = await post_crud.get_or_404(get_test_session, 1)
+    assert (post.likes, post.dislikes) == (2, 1)
+    assert await counter_buffer.flush() == 1
+    assert counter_buffer.pending(1) == (0, 0)
+    assert await _stored_counters() == (2, 1)
+    get_test_session.expunge_all()
+    post = await post_crud.get_or_404(get_test_session, 1)
+    assert (post.likes, post.dislikes) == (2, 1)
+
+
+@pytest.mark.anyio
+async def test_counter_buffer_flushes_by_events_and_on_stop(get_test_session, create_users, counter_buffer):
+    counter_buffer.flush_events = 2
+    counter_buffer.start()
+    _, *users = await _create_users_and_post(get_test_session, create_users, 4)
+    for user in users[:2]:
+        await post_crud.like_dislike_post(get_test_session, 1, user)
+    await counter_buffer._flush_task
+    assert await _stored_counters() == (2, 0)
+    await post_crud.like_dislike_post(get_test_session, 1, users[2], like=False)
+    await counter_buffer.stop()
+    assert await _stored_counters() == (2, 1)
+
+
+@pytest.mark.anyio
+async def test_projection(get_test_session, create_users):
+    await _create_users_and_post(get_test_session, create_users, 1)
+    post = await post_crud.get_or_404(get_test_session, 1)
+    [row] = await post_crud.get_user_posts(get_test_session, post.author, projection=True)
+    assert 'hashed_password' not in row._fields
+    assert tuple(row) == post_row(post)
+    assert dumps_post(row) == dumps_post(post_row(post))
+    assert await post_crud.get_all(get_test_session, projection=True, cursor=post_crud.next_cursor([row], 1)) == []
+
+
+@pytest.mark.anyio
+async def test_update_delete_single_statement(get_test_session, create_users, statements):
+    author, _ = await _create_users_and_post(get_test_session, create_users, 2)
+    statements.clear()
+    post = await post_crud.update(get_test_session, 1, PostUpdate(title='new title'), user=author)
+    assert (post.title, post.author.email) == ('new title', author.email)
+    assert post.updated is not None
+    post = await post_crud.delete(get_test_session, 1, author)
+    assert post.title == 'new title'
+    assert [statement.split()[0] for statement in statements] == ['UPDATE', 'DELETE']
+    assert await get_test_session.get(Post, 1) is None
+
+
+@pytest.mark.parametrize('mode', ('buffer', 'shards'))
+@pytest.mark.anyio
+async def test_update_delete_show_counter_deltas(get_test_session, create_users, monkeypatch, request, mode):
+    if mode == 'buffer':
+        request.getfixturevalue('counter_buffer')
+    else:
+        monkeypatch.setattr(settings, 'like_counter_shards', 4)
+    author, user = await _create_users_and_post(get_test_session, create_users, 2)
+    await post_crud.like_dislike_post(get_test_session, 1, user)
+    for title in ('new title', 'newer title'):
+        post = await post_crud.update(get_test_session, 1, PostUpdate(title=title), user=author)
+        assert (post.likes, post.dislikes) == (1, 0)
+    post = await post_crud.delete(get_test_session, 1, author)
+    assert (post.likes, post.dislikes) == (1, 0)
+
+
+@pytest.mark.parametrize('method, args', (
+    ('update', (PostUpdate(title='new title'),)),
+    ('delete', ()),
+))
+@pytest.mark.parametrize('post_id, user_index, status, msg', (
+    (2, 0, HTTPStatus.NOT_FOUND, 'Пост(ы) не найден(ы).'),
+    (1, 1, HTTPStatus.BAD_REQUEST, 'У вас нет права доступа к данному посту.'),
+))
+@pytest.mark.anyio
+async def test_update_delete_exceptions(get_test_session, create_users, method, args, post_id, user_index, status, msg):
+    users = await _create_users_and_post(get_test_session, create_users)
+    with pytest.raises(HTTPException) as exc_info:
+        await getattr(post_crud, method)(get_test_session, post_id, *args, user=users[user_index])
+    assert exc_info.value.args == (status, msg)
+    assert (await post_crud.get_or_404(get_test_session, 1)).title == POST_SAVE_DATA['title']
+
+
+@pytest.mark.anyio
+async def test_update_unique_title(get_test_session, create_users):
+    author, *_ = await _create_users_and_post(get_test_session, create_users)
+    await post_crud._save(get_test_session, Post(**{**POST_SAVE_DATA, 'title': 'other title'}))
+    with pytest.raises(HTTPException) as exc_info:
+        await post_crud.update(get_test_session, 2, PostUpdate(title=POST_SAVE_DATA['title']), user=author)
+    assert exc_info.value.args == (HTTPStatus.BAD_REQUEST, 'Пост с таким заголовком уже существует.')
+
+
+@pytest.mark.anyio
+async def test_bulk_create(get_test_session, create_users):
+    author, *_ = await _create_users_and_post(get_test_session, create_users, 1)
+    titles = ['title 1', POST_SAVE_DATA['title'], 'title 2', 'title 1', 'title 3']
+    payloads = [PostCreate(title=title, content=POST_SAVE_DATA['content']) for title in titles]
+    assert await post_crud.bulk_create(get_test_session, payloads, user=author, chunk_size=2) == [1, 3]
+    posts = (await get_test_session.scalars(select(Post).order_by(Post.id))).all()
+    assert [post.title for post in posts] == [POST_SAVE_DATA['title'], 'title 1', 'title 2', 'title 3']
+    assert {post.author_id for post in posts} == {author.id}
+    assert all(post.created is not None and post.likes == 0 for post in posts)
@@ -7,7 +7,7 @@ from .fixtures.data import (AUTH_USER, AUTHOR, DISLIKE_ENDPOINT,
                             NO_PERMISSION_MSG, NO_SELF_LIKE_DISLIKE_MSG,
                             POST_NOT_FOUND_MSG, POST_PAYLOAD, PUT_PAYLOAD)
 from .fixtures.endpoints_testlib import (DELETE, GET, PATCH, POST, PUT,
-                                         assert_msg, assert_response,
+                                         assert_msg, assert_response, client,
                                          get_auth_user_token, get_headers,
                                          standard_tests)
 from .utils import (check_created_post, check_disliked_post, check_liked_post,
@@ -148,3 +148,25 @@ def test_allowed_methods(user, method, endpoint, post_id, payload, func, msg):
 def test_json_invalid_values(method, payload, test_func):
     headers = get_headers(get_auth_user_token(AUTHOR)) if method is POST else create_post()
     test_func(method, payload, headers)
+
+
+# === PAGINATION ===
+@pytest.mark.parametrize('endpoint', (ENDPOINT, MY_POSTS_ENDPOINT))
+def test_pagination(endpoint):
+    headers = get_headers(get_auth_user_token(AUTHOR))
+    for i in range(3):
+        client.post(f'/{ENDPOINT}/', headers=headers, json={**POST_PAYLOAD, 'title': f'{i} {POST_PAYLOAD["title"]}'})
+    ids, params = [], {'limit': 2}
+    while True:
+        response = assert_response(HTTPStatus.OK, GET, endpoint, params=params, headers=headers)
+        ids += [post['id'] for post in response.json()]
+        if 'X-Next-Cursor' not in response.headers:
+            break
+        params['cursor'] = response.headers['X-Next-Cursor']
+    assert ids == [1, 2, 3]
+
+
+@pytest.mark.parametrize('params', ({'limit': 0}, {'limit': 10**6}, {'cursor': '-invalid-'}))
+def test_pagination_invalid_params(params):
+    status = HTTPStatus.BAD_REQUEST if 'cursor' in params else HTTPStatus.UNPROCESSABLE_ENTITY
+    assert_response(status, GET, ENDPOINT, params=params)
@@ -0,0 +1,87 @@
+import pytest
+
+from app.crud.post import post_crud
+
+from .conftest import Post, User
+from .fixtures.data import AUTH_USER, ENDPOINT, LIKE_ENDPOINT, POST_PAYLOAD, PUT_PAYLOAD
+from .fixtures.endpoints_testlib import client, get_auth_user_token, get_headers
+from .utils import create_post
+
+
+def _get(path: str, etag: str | None = None):
+    return client.get(path, headers={} if etag is None else {'If-None-Match': etag})
+
+
+def test_post_not_modified(statements):
+    author_headers = create_post()
+    response = _get(f'{ENDPOINT}/1')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'].startswith('public, max-age=')
+    statements.clear()
+    response = _get(f'{ENDPOINT}/1', etag)
+    assert response.status_code == 304
+    assert response.content == b''
+    assert (response.headers['ETag'], statements) == (etag, [])
+    for header in (f'W/{etag}', f'"other", {etag}', '*'):
+        assert _get(f'{ENDPOINT}/1', header).status_code == 304
+    assert _get(f'{ENDPOINT}/1', '"other"').status_code == 200
+    client.get(f'{LIKE_ENDPOINT}/1', headers=get_headers(get_auth_user_token(AUTH_USER)))
+    response = _get(f'{ENDPOINT}/1', etag)
+    assert (response.status_code, response.json()['likes']) == (200, 1)
+    liked_etag = response.headers['ETag']
+    assert liked_etag != etag
+    client.put(f'{ENDPOINT}/1', headers=author_headers, json=PUT_PAYLOAD)
+    assert _get(f'{ENDPOINT}/1', liked_etag).status_code == 200
+
+
+def test_post_not_modified_without_cache(statements):
+    create_post()
+    etag = _get(f'{ENDPOINT}/1').headers['ETag']
+    post_crud.cache.clear()
+    statements.clear()
+    assert _get(f'{ENDPOINT}/1', etag).status_code == 304
+    [statement] = [statement for statement in statements if 'FROM post' in statement]
+    assert 'post.content' not in statement
+    assert _get(f'{ENDPOINT}/2', etag).status_code == 404
+
+
+def test_posts_not_modified(statements):
+    headers = create_post()
+    response = _get(f'{ENDPOINT}/?limit=1')
+    etag = response.headers['ETag']
+    statements.clear()
+    response = _get(f'{ENDPOINT}/?limit=1', etag)
+    assert response.status_code == 304
+    assert response.headers['X-Next-Cursor']
+    assert not [statement for statement in statements if 'post.content' in statement]
+    client.post(ENDPOINT, headers=headers, json={**POST_PAYLOAD, 'title': 'Second post.'})
+    assert _get(f'{ENDPOINT}/?limit=1', etag).status_code == 304
+    response = _get(f'{ENDPOINT}/', etag)
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_private_posts_are_not_cached():
+    headers = create_post()
+    response = client.get(f'{ENDPOINT}/my_posts/', headers=headers)
+    assert response.status_code == 200
+    assert 'Cache-Control' not in response.headers
+    assert 'Cache-Control' in client.get(f'{ENDPOINT}/top').headers
+
+
+@pytest.mark.anyio
+async def test_etag_changes_with_author(get_test_session):
+    session = get_test_session
+    author = User(email='author@example.com', hashed_password='password', is_active=True,
+                  is_superuser=False, is_verified=False)
+    session.add(author)
+    await session.commit()
+    session.add(Post(title='title', content='content', author_id=author.id))
+    await session.commit()
+    etag = await post_crud.get_etag_or_404(session, 1)
+    row = await post_crud.get_by_attr(session, 'id', 1, projection=True)
+    assert post_crud.etag(row) == etag
+    author.is_verified = True
+    await session.commit()
+    assert await post_crud.get_etag_or_404(session, 1) != etag
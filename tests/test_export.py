@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from datetime import datetime as dt
+
+import pytest
+import pytest_asyncio
+
+from app.crud.post import post_crud
+from app.serializers.post import CSV_HEADER
+
+from .conftest import Post, TestingSessionLocal, User
+from .fixtures.data import POST_SAVE_DATA
+from .fixtures.endpoints_testlib import client
+
+ENDPOINT = '/post/export'
+
+
+@pytest_asyncio.fixture
+async def posts():
+    async with TestingSessionLocal() as session:
+        session.add(User(email='user@example.com', hashed_password='password', is_active=True,
+                         is_superuser=False, is_verified=False))
+        session.add_all(Post(**{**POST_SAVE_DATA, 'title': f'title {day}'}, created=dt(2023, 1, day))
+                        for day in range(1, 6))
+        await session.commit()
+
+
+@pytest.mark.anyio
+async def test_stream(get_test_session, posts):
+    batches = [batch async for batch in post_crud.stream(get_test_session, batch_size=2)]
+    assert [[post.id for post in batch] for batch in batches] == [[1, 2], [3, 4], [5]]
+    batches = [batch async for batch in post_crud.stream_posts(get_test_session, dt(2023, 1, 2), dt(2023, 1, 4))]
+    assert [row.title for batch in batches for row in batch] == ['title 3', 'title 2']
+
+
+def test_export_ndjson(superuser_only_client, posts):
+    response = client.get(ENDPOINT)
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row['title'] for row in rows] == [f'title {day}' for day in range(5, 0, -1)]
+    assert rows[0]['author']['email'] == 'user@example.com'
+    assert rows[0] == client.get('/post/5').json()
+
+
+def test_export_csv(superuser_only_client, posts):
+    response = client.get(ENDPOINT, params={'format': 'csv', 'created_from': '2023-01-04T00:00:00'})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    header, *rows = csv.reader(io.StringIO(response.text))
+    assert tuple(header) == CSV_HEADER
+    assert [row[1] for row in rows] == ['title 5', 'title 4']
+    assert rows[0][3] == '2023-01-05T00:00:00'
+
+
+def test_export_unauthorized():
+    assert client.get(ENDPOINT).status_code == 401
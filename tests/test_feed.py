@@ -0,0 +1,86 @@
+from datetime import datetime as dt
+from datetime import timedelta
+
+import pytest
+
+from app.core import settings
+from app.crud.follow import follow_crud
+from app.crud.post import post_crud
+
+from .conftest import Post, User, engine
+from .fixtures.data import AUTH_USER, AUTHOR, ENDPOINT, POST_PAYLOAD
+from .fixtures.endpoints_testlib import client, get_auth_user_token, get_headers
+from .query_plan import QueryPlanChecker
+from .utils import create_post
+
+FEED_ENDPOINT = 'feed'
+FOLLOW_ENDPOINT = 'follow'
+NOW = dt(2026, 10, 18, 12)
+
+
+def _titles(response) -> list[str]:
+    return [post['title'] for post in response.json()]
+
+
+def test_feed():
+    author_headers = create_post()
+    client.post(ENDPOINT, headers=author_headers, json={**POST_PAYLOAD, 'title': 'Second post.'})
+    headers = get_headers(get_auth_user_token(AUTH_USER))
+    client.post(ENDPOINT, headers=headers, json={**POST_PAYLOAD, 'title': 'Own post.'})
+    assert client.get(FEED_ENDPOINT, headers=headers).json() == []
+    response = client.post(f'{FOLLOW_ENDPOINT}/1', headers=headers)
+    assert (response.status_code, response.json()['email']) == (200, AUTHOR['email'])
+    assert client.post(f'{FOLLOW_ENDPOINT}/1', headers=headers).status_code == 200
+    response = client.get(FEED_ENDPOINT, headers=headers, params={'limit': 1})
+    assert _titles(response) == ['Second post.']
+    response = client.get(FEED_ENDPOINT, headers=headers, params={
+        'limit': 1, 'cursor': response.headers['X-Next-Cursor']})
+    assert _titles(response) == [POST_PAYLOAD['title']]
+    assert response.json()[0]['author']['email'] == AUTHOR['email']
+    response = client.get(FEED_ENDPOINT, headers=headers, params={
+        'limit': 1, 'cursor': response.headers['X-Next-Cursor']})
+    assert (response.json(), 'X-Next-Cursor' in response.headers) == ([], False)
+    assert client.delete(f'{FOLLOW_ENDPOINT}/1', headers=headers).status_code == 200
+    assert client.get(FEED_ENDPOINT, headers=headers).json() == []
+
+
+@pytest.mark.parametrize('method, path, status', (
+    ('post', f'{FOLLOW_ENDPOINT}/2', 400),
+    ('post', f'{FOLLOW_ENDPOINT}/3', 404),
+    ('delete', f'{FOLLOW_ENDPOINT}/3', 404),
+    ('get', f'{FEED_ENDPOINT}?cursor=invalid', 400),
+))
+def test_feed_errors(method, path, status):
+    create_post()
+    headers = get_headers(get_auth_user_token(AUTH_USER))
+    assert client.request(method, path, headers=headers).status_code == status
+    assert client.request(method, path).status_code == 401
+
+
+async def _seed(session, create_users, users: int = 4, posts: int = 20) -> list[User]:
+    users = await create_users(users)
+    session.add_all(Post(title=f'title {i}', content='content', author_id=users[i % len(users)].id,
+                         created=NOW - timedelta(minutes=i // 2)) for i in range(posts))
+    await session.commit()
+    return users
+
+
+@pytest.mark.anyio
+async def test_feed_merges_followed_authors(get_test_session, create_users, monkeypatch):
+    reader, *authors = await _seed(get_test_session, create_users)
+    for author in authors[:2]:
+        await follow_crud.follow(get_test_session, author.id, reader)
+    feed, cursor = [], None
+    with QueryPlanChecker(engine, ('post', 'follow')) as checker:
+        while True:
+            page = await post_crud.get_feed(get_test_session, reader, limit=3, cursor=cursor)
+            feed += page
+            cursor = post_crud.next_feed_cursor(page, 3)
+            if cursor is None:
+                break
+    checker.assert_no_full_scans()
+    assert [row.author_id for row in feed] == [authors[0].id, authors[1].id] * 5
+    assert feed == sorted(feed, key=lambda row: (-row.created.timestamp(), row.id))
+    monkeypatch.setattr(settings, 'feed_max_authors', 1)
+    page = await post_crud.get_feed(get_test_session, reader)
+    assert {row.author_id for row in page} == {authors[1].id}
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from app.api.ndjson import read_lines
+
+from .fixtures.data import AUTH_USER, POST_ALREADY_EXISTS_MSG, POST_PAYLOAD
+from .fixtures.endpoints_testlib import client
+
+ENDPOINT = '/post/import'
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.anyio
+async def test_read_lines():
+    lines = [line async for line in read_lines(_chunks(b'{"a"', b': 1}\n\n{"b": 2}\n{', b'"c": 3}'))]
+    assert lines == [(1, b'{"a": 1}'), (3, b'{"b": 2}'), (4, b'{"c": 3}')]
+
+
+def test_import_posts(superuser_only_client, monkeypatch):
+    monkeypatch.setattr('app.core.settings.bulk_chunk_size', 2)
+    assert client.post('/auth/register', json=AUTH_USER).status_code == 201
+    posts = [{**POST_PAYLOAD, 'title': f'{i} {POST_PAYLOAD["title"]}'} for i in range(5)]
+    lines = [json.dumps(post) for post in posts]
+    lines.insert(2, '{"title": "no content"}')
+    lines.insert(4, '')
+    lines.append(json.dumps(posts[0]))
+    lines.append('{invalid')
+
+    def body():
+        for line in lines:
+            yield f'{line}\n'.encode()
+
+    response = client.post(ENDPOINT, content=body(), headers={'Content-Type': 'application/x-ndjson'})
+    assert response.status_code == 200, response.json()
+    result = response.json()
+    assert result['created'] == 5
+    assert [error['line'] for error in result['errors']] == [3, 8, 9]
+    assert result['errors'][1]['detail'] == POST_ALREADY_EXISTS_MSG
+    titles = [post['title'] for post in client.get('/post/', params={'limit': 10}).json()]
+    assert titles == [post['title'] for post in posts]
+
+
+def test_import_posts_unauthorized():
+    assert client.post(ENDPOINT, content=b'{}').status_code == 401
@@ -0,0 +1,101 @@
+import re
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import settings
+from app.core.pool import ObservedQueuePool, engine_options, observe_pool
+from app.core.request_stats import RequestStats, current_stats, timed_serialization
+from app.core.user import user_cache
+
+from .conftest import SQLALCHEMY_DATABASE_URL
+from .fixtures.endpoints_testlib import client
+from .utils import create_post
+
+
+def test_engine_options():
+    assert engine_options('sqlite+aiosqlite:///./fastapi.db') == {
+        'pool_pre_ping': settings.db_pool_pre_ping,
+        'query_cache_size': settings.db_query_cache_size,
+    }
+    options = engine_options('postgresql+asyncpg://user:password@db/db')
+    assert options['poolclass'] is ObservedQueuePool
+    assert options['pool_size'] == settings.db_pool_size
+    assert options['max_overflow'] == settings.db_max_overflow
+    assert options['connect_args'] == {
+        'prepared_statement_cache_size': settings.db_prepared_statement_cache_size}
+
+
+@pytest.mark.anyio
+async def test_observe_pool():
+    def sample(name):
+        return REGISTRY.get_sample_value(name, {'engine': 'observed'}) or 0
+
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=ObservedQueuePool, pool_size=2)
+    observe_pool(engine, 'observed')
+    count = sample('db_pool_wait_seconds_count')
+    async with engine.connect() as conn:
+        await conn.execute(text('SELECT 1'))
+        assert sample('db_pool_checked_out') == 1
+    assert sample('db_pool_checked_out') == 0
+    assert sample('db_pool_wait_seconds_count') == count + 1
+    assert sample('db_pool_size') == 2
+    await engine.dispose()
+    async with engine.connect() as conn:
+        await conn.execute(text('SELECT 1'))
+    assert sample('db_pool_wait_seconds_count') == count + 2
+    await engine.dispose()
+
+
+def test_metrics_endpoint():
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'db_pool_checked_out{engine="primary"}' in response.text
+
+
+def _server_timing(response) -> dict[str, str]:
+    return dict(metric.strip().split(';', 1) for metric in response.headers['Server-Timing'].split(','))
+
+
+def _sample(name: str, labels: str) -> float:
+    match = re.search(rf'^{name}{{{re.escape(labels)}}} (\S+)$', client.get('/metrics').text, re.M)
+    return float(match.group(1)) if match else 0
+
+
+def test_request_stats(monkeypatch, caplog):
+    route = 'method="GET",route="/post/{post_id}"'
+    requests = _sample('http_request_duration_seconds_count', route)
+    headers = create_post()
+    response = client.get('/post/1')
+    timing = _server_timing(response)
+    assert set(timing) == {'app', 'db', 'serialization'}
+    assert re.fullmatch(r'dur=[\d.]+;desc="[1-9]\d* statements / [1-9]\d* rows"', timing['db'])
+    assert _sample('http_request_duration_seconds_count', route) == requests + 1
+    assert _sample('http_request_sql_statements_count', route) == requests + 1
+    assert _sample('http_request_serialization_duration_seconds_count', route) == requests + 1
+    # Served from the cache
+    assert _server_timing(client.get('/post/1'))['db'].endswith('desc="0 statements / 0 rows"')
+    route = 'method="PUT",route="/post/{post_id}"'
+    exceeded = _sample('http_request_query_budget_exceeded_total', route)
+    monkeypatch.setattr(settings, 'query_budget', 1)
+    client.get('/post/1')
+    # The cached user is merged into the session without a SELECT
+    user_cache.clear()
+    client.put('/post/1', headers=headers, json={'title': 'New title.'})
+    assert re.search(r'PUT /post/\{post_id\} ran [2-9] SQL statements, the query budget is 1\.', caplog.text)
+    assert 'GET /post/{post_id} ran' not in caplog.text
+    assert _sample('http_request_query_budget_exceeded_total', route) == exceeded + 1
+
+
+def test_timed_serialization():
+    token = current_stats.set(RequestStats())
+    try:
+        assert timed_serialization(lambda value: time.sleep(0.01) or value)(1) == 1
+        assert current_stats.get().serialization_duration >= 0.01
+    finally:
+        current_stats.reset(token)
+    assert timed_serialization(str)(1) == '1'
@@ -0,0 +1,49 @@
+import pytest
+
+from app.core import settings
+from app.crud.post import post_crud
+from app.models import User
+
+from .conftest import Post, PostCreate, engine
+from .fixtures.data import POST_PAYLOAD, POST_SAVE_DATA
+from .query_plan import QueryPlanChecker
+
+LARGE_TABLES = ('post', 'post_counter', 'reaction')
+
+
+async def _seed(session, create_users, posts: int = 20) -> list[User]:
+    users = await create_users(2)
+    session.add_all(Post(**{**POST_SAVE_DATA, 'title': f'{i} {POST_SAVE_DATA["title"]}'}) for i in range(posts))
+    await session.commit()
+    return users
+
+
+@pytest.mark.parametrize('shards', (1, 4))
+@pytest.mark.anyio
+async def test_crud_queries_use_indexes(get_test_session, create_users, monkeypatch, shards):
+    monkeypatch.setattr(settings, 'like_counter_shards', shards)
+    author, user = await _seed(get_test_session, create_users)
+    with QueryPlanChecker(engine, LARGE_TABLES) as checker:
+        for projection in (False, True):
+            page = await post_crud.get_all(get_test_session, limit=5, projection=projection)
+            await post_crud.get_all(get_test_session, limit=5, cursor=post_crud.next_cursor(page, 5), projection=projection)
+            await post_crud.get_user_posts(get_test_session, author, limit=5, projection=projection)
+            await post_crud.get_by_attr(get_test_session, 'id', 1, projection=projection)
+        await post_crud.get_or_404(get_test_session, 2)
+        await post_crud.like_dislike_post(get_test_session, 3, user)
+        await post_crud.like_dislike_post(get_test_session, 3, user, like=False)
+        await post_crud.update(get_test_session, 4, PostCreate(**POST_PAYLOAD), user=author)
+        await post_crud.delete(get_test_session, 5, user=author)
+    checker.assert_no_full_scans()
+
+
+@pytest.mark.anyio
+async def test_full_scan_is_detected(get_test_session, create_users):
+    await _seed(get_test_session, create_users)
+    with QueryPlanChecker(engine, LARGE_TABLES) as checker:
+        await post_crud.get_all(get_test_session)
+        await post_crud.get_all_by_attr(get_test_session, 'content', POST_SAVE_DATA['content'], limit=5)
+    [(_, scans_1), (_, scans_2)] = checker.violations
+    assert scans_1 == scans_2 == ['SCAN post']
+    with pytest.raises(AssertionError):
+        checker.assert_no_full_scans()
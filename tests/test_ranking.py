@@ -0,0 +1,137 @@
+from datetime import datetime as dt
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core import settings
+from app.crud.buffer import CounterBuffer
+from app.crud.post import post_crud
+from app.crud import ranking as ranking_module
+from app.crud.ranking import HotRanking
+
+from .conftest import Post, TestingSessionLocal, User
+from .fixtures.endpoints_testlib import client
+
+NOW = dt(2026, 10, 18, 12)
+# hours ago, likes, dislikes
+POSTS = ((1, 1, 0), (30, 6, 1), (2, 0, 2), (24 * 8, 9, 0), (3, 2, 0))
+
+
+async def _create_posts(session, create_users) -> list[User]:
+    users = await create_users(10)
+    session.add_all(Post(title=f'title {i}', content='content', author_id=users[0].id,
+                         created=NOW - timedelta(hours=hours))
+                    for i, (hours, _, _) in enumerate(POSTS))
+    await session.commit()
+    for post_id, (_, likes, dislikes) in enumerate(POSTS, 1):
+        for user in users[1:1 + likes]:
+            await post_crud.like_dislike_post(session, post_id, user)
+        for user in users[-dislikes or len(users):]:
+            await post_crud.like_dislike_post(session, post_id, user, like=False)
+    return users
+
+
+async def _ratings(session) -> list[int]:
+    session.expunge_all()
+    return list(await session.scalars(select(Post.rating).order_by(Post.id)))
+
+
+def _ranking() -> HotRanking:
+    return HotRanking(TestingSessionLocal, interval_seconds=60, gravity=1.8, window_days=7)
+
+
+@pytest.mark.anyio
+async def test_rating_is_maintained(get_test_session, create_users):
+    users = await _create_posts(get_test_session, create_users)
+    assert await _ratings(get_test_session) == [1, 5, -2, 9, 2]
+    await post_crud.like_dislike_post(get_test_session, 3, users[-1])
+    assert (await _ratings(get_test_session))[2] == 0
+
+
+@pytest.mark.anyio
+async def test_rating_is_maintained_sharded(get_test_session, create_users, monkeypatch):
+    monkeypatch.setattr(settings, 'like_counter_shards', 4)
+    await _create_posts(get_test_session, create_users)
+    top = await post_crud.get_top(get_test_session, 'rating')
+    assert [(row.id, row.rank) for row in top] == [(4, 9), (2, 5), (5, 2), (1, 1), (3, -2)]
+    assert await _ranking().recompute(NOW) == 4
+    assert [row.id for row in await post_crud.get_top(get_test_session)] == [1, 5, 2, 4, 3]
+    await post_crud.fold_counter_shards(get_test_session)
+    assert await _ratings(get_test_session) == [1, 5, -2, 9, 2]
+
+
+@pytest.mark.anyio
+async def test_rating_is_maintained_buffered(get_test_session, create_users, monkeypatch):
+    buffer = CounterBuffer(TestingSessionLocal, flush_interval_ms=10**6, flush_events=10**6)
+    monkeypatch.setattr(post_crud, 'counter_buffer', buffer)
+    await _create_posts(get_test_session, create_users)
+    assert await _ratings(get_test_session) == [0] * len(POSTS)
+    await buffer.flush()
+    assert await _ratings(get_test_session) == [1, 5, -2, 9, 2]
+
+
+@pytest.mark.anyio
+async def test_recompute(get_test_session, create_users):
+    await _create_posts(get_test_session, create_users)
+    ranking = _ranking()
+    assert await ranking.recompute(NOW) == 4
+    get_test_session.expunge_all()
+    hot = dict((await get_test_session.execute(select(Post.id, Post.hot))).all())
+    assert hot[1] == pytest.approx(ranking.score(1, NOW - timedelta(hours=1), NOW))
+    assert hot[4] == 0
+    assert [row.id for row in await post_crud.get_top(get_test_session)] == [1, 5, 2, 4, 3]
+    assert [row.id for row in await post_crud.get_top(get_test_session, 'rating')] == [4, 2, 5, 1, 3]
+    # The oldest posts of the window leave it.
+    assert await ranking.recompute(NOW + timedelta(days=6, hours=12)) == 3
+    get_test_session.expunge_all()
+    assert await get_test_session.scalar(select(Post.hot).where(Post.id == 2)) == 0
+
+
+@pytest.mark.parametrize('order, expected', (('hot', [1, 5, 2, 4, 3]), ('rating', [4, 2, 5, 1, 3])))
+@pytest.mark.anyio
+async def test_get_top_pagination(get_test_session, create_users, order, expected):
+    await _create_posts(get_test_session, create_users)
+    await _ranking().recompute(NOW)
+    ids, cursor = [], None
+    while True:
+        rows = await post_crud.get_top(get_test_session, order, limit=2, cursor=cursor)
+        ids += [row.id for row in rows]
+        cursor = post_crud.next_rank_cursor(rows, 2)
+        if cursor is None:
+            break
+    assert ids == expected
+
+
+def test_top_endpoint():
+    client.post('/auth/register', json={'email': 'user@example.com', 'password': 'password'})
+    token = client.post('/auth/jwt/login', data={'username': 'user@example.com', 'password': 'password'}).json()['access_token']
+    for i in range(3):
+        client.post('/post/', json={'title': f'title {i}', 'content': 'content'}, headers={'Authorization': f'Bearer {token}'})
+    response = client.get('/post/top', params={'order': 'rating', 'limit': 2})
+    assert response.status_code == 200
+    assert [post['id'] for post in response.json()] == [1, 2]
+    response = client.get('/post/top', params={'order': 'rating', 'cursor': response.headers['X-Next-Cursor']})
+    assert [post['id'] for post in response.json()] == [3]
+    assert client.get('/post/top').status_code == 200
+    assert client.get('/post/top', params={'order': 'new'}).status_code == 422
+
+
+@pytest.mark.parametrize('interval, expected', ((0, ['recompute']), (60, ['run'])))
+@pytest.mark.anyio
+async def test_ranking_process(monkeypatch, interval, expected):
+    ranking = _ranking()
+    ranking.interval = interval
+    calls = []
+
+    async def recompute(now=None):
+        calls.append('recompute')
+
+    async def run():
+        calls.append('run')
+
+    monkeypatch.setattr(ranking, 'recompute', recompute)
+    monkeypatch.setattr(ranking, 'run', run)
+    monkeypatch.setattr(ranking_module, 'hot_ranking', ranking)
+    await ranking_module.main()
+    assert calls == expected
@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.replica import ReplicaRouter, get_read_session
+from app.crud.post import post_crud
+from app.serializers.post import dumps_post
+
+from .conftest import Base, Post, User
+from .fixtures.endpoints_testlib import client
+
+
+def _create_replica(path, title: str) -> str:
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(email='user@example.com', hashed_password='password'))
+        session.add(Post(title=title, content='content', author_id=1))
+        session.commit()
+    engine.dispose()
+    return f'sqlite+aiosqlite:///{path}'
+
+
+@pytest.fixture
+def router(tmp_path):
+    router = ReplicaRouter([
+        _create_replica(tmp_path / 'replica0.db', 'replica0'),
+        f'sqlite+aiosqlite:///{tmp_path / "missing" / "replica.db"}',
+        _create_replica(tmp_path / 'replica1.db', 'replica1'),
+    ], cooldown=60, sticky_seconds=60)
+    yield router
+
+
+@pytest.mark.anyio
+async def test_sticky_writers_shared(router, tmp_path):
+    other = ReplicaRouter([], sticky_seconds=60, writers=router.writers)
+    await router.mark_written(1)
+    assert await other.is_sticky(1)
+    await router.dispose()
+
+
+async def _read_title(session) -> str:
+    return (await session.get(Post, 1)).title
+
+
+@pytest.mark.anyio
+async def test_round_robin_and_failover(router):
+    titles = []
+    for _ in range(4):
+        async with router.open_session() as session:
+            titles.append(await _read_title(session))
+    assert titles == ['replica0', 'replica1', 'replica0', 'replica1']
+    await router.dispose()
+
+
+@pytest.mark.anyio
+async def test_single_checkout_per_query(router):
+    checkouts = []
+    event.listen(router.engines[0].sync_engine.pool, 'checkout', lambda *args: checkouts.append(1))
+    async with router.open_session() as session:
+        await _read_title(session)
+    assert len(checkouts) == 1
+    await router.dispose()
+
+
+@pytest.mark.anyio
+async def test_no_healthy_replicas(tmp_path):
+    router = ReplicaRouter([f'sqlite+aiosqlite:///{tmp_path / "missing" / "replica.db"}'])
+    async with router.open_session() as session:
+        with pytest.raises(OperationalError):
+            await _read_title(session)
+    assert router.open_session() is None
+    assert ReplicaRouter([]).open_session() is None
+    await router.dispose()
+
+
+@pytest.mark.anyio
+async def test_read_session_sticky(router, monkeypatch, get_test_session):
+    monkeypatch.setattr('app.core.replica.replica_router', router)
+    user = User(id=1)
+    sessions = get_read_session(user, get_test_session)
+    assert await anext(sessions) is not get_test_session
+    await sessions.aclose()
+    await router.mark_written(user.id)
+    assert await router.is_sticky(user.id)
+    assert not await router.is_sticky(2) and not await router.is_sticky(None)
+    sessions = get_read_session(user, get_test_session)
+    assert await anext(sessions) is get_test_session
+    await sessions.aclose()
+    await router.dispose()
+
+
+@pytest.mark.anyio
+async def test_invalidated_object_not_cached_from_replica(router):
+    await post_crud.invalidate(1)
+    async with router.open_session() as session:
+        await post_crud.get_serialized_or_404(session, 1, dumps_post, projection=True)
+    assert await post_crud.cache.get(post_crud._cache_key(1)) is None
+    await router.dispose()
+
+
+def test_endpoints_read_from_replicas(router, monkeypatch):
+    monkeypatch.setattr('app.core.replica.replica_router', router)
+    monkeypatch.setattr(post_crud, 'cache', None)
+    assert [client.get('/post/1').json()['title'] for _ in range(2)] == ['replica0', 'replica1']
+    assert [client.get('/post/').json()[0]['title'] for _ in range(2)] == ['replica0', 'replica1']
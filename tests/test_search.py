@@ -0,0 +1,113 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+
+from app.crud.post import post_crud
+from app.crud.search import SearchBackend
+from app.schemas import PostCreate, PostUpdate
+
+from .conftest import User
+from .fixtures.endpoints_testlib import client
+
+POSTS = (
+    ('Пост о рыбалке', 'Как ловить: щука берет на спиннинг.'),
+    ('Кулинария', 'Рецепт ухи: щука, картофель, лук.'),
+    ('Погода', 'Завтра дождь, рыбалка отменяется.'),
+    ('Щука и окунь', 'Щука крупнее окуня, щука хищник.'),
+)
+
+
+async def _create_posts(session) -> User:
+    user = User(email='user@example.com', hashed_password='password', is_active=True,
+                is_superuser=False, is_verified=False)
+    session.add(user)
+    await session.commit()
+    for title, content in POSTS:
+        await post_crud.create(session, PostCreate(title=title, content=content), user=user)
+    return user
+
+
+@pytest.mark.anyio
+async def test_search_ranked(get_test_session):
+    await _create_posts(get_test_session)
+    rows = await post_crud.search(get_test_session, 'щука')
+    assert [row.id for row in rows] == [4, 2, 1]
+    assert rows[0].rank > rows[-1].rank
+    assert [row.id for row in await post_crud.search(get_test_session, 'щука ловить')] == [1]
+    assert await post_crud.search(get_test_session, 'ласты') == []
+
+
+@pytest.mark.parametrize('query', ('"', 'AND', 'щу*', 'NEAR(a b)', '   ', 'title:x'))
+@pytest.mark.anyio
+async def test_search_query_syntax_is_escaped(get_test_session, query):
+    await _create_posts(get_test_session)
+    assert await post_crud.search(get_test_session, query) == []
+
+
+@pytest.mark.anyio
+async def test_search_pagination(get_test_session):
+    await _create_posts(get_test_session)
+    ids, cursor = [], None
+    while True:
+        rows = await post_crud.search(get_test_session, 'щука', limit=2, cursor=cursor)
+        ids += [row.id for row in rows]
+        cursor = post_crud.next_rank_cursor(rows, 2)
+        if cursor is None:
+            break
+    assert ids == [4, 2, 1]
+
+
+@pytest.mark.parametrize('cursor', ('-invalid-', 'W10', 'WyJhIiwxXQ'))
+@pytest.mark.anyio
+async def test_search_invalid_cursor(get_test_session, cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        await post_crud.search(get_test_session, 'щука', cursor=cursor)
+    assert exc_info.value.args == (HTTPStatus.BAD_REQUEST, 'Invalid pagination cursor.')
+
+
+@pytest.mark.anyio
+async def test_search_index_maintenance(get_test_session, monkeypatch):
+    calls = []
+
+    class Backend(SearchBackend):
+        async def index(self, session, post):
+            calls.append(('index', post.id))
+
+        async def remove(self, session, post_id):
+            calls.append(('remove', post_id))
+
+    user = await _create_posts(get_test_session)
+    await post_crud.update(get_test_session, 1, PostUpdate(content='Про карася.'), user=user)
+    assert [row.id for row in await post_crud.search(get_test_session, 'карася')] == [1]
+    assert [row.id for row in await post_crud.search(get_test_session, 'щука')] == [4, 2]
+    await post_crud.delete(get_test_session, 4, user)
+    assert [row.id for row in await post_crud.search(get_test_session, 'щука')] == [2]
+    monkeypatch.setattr(post_crud, 'search_backend', Backend())
+    await post_crud.update(get_test_session, 2, PostUpdate(content='Уха.'), user=user)
+    await post_crud.delete(get_test_session, 2, user)
+    assert calls == [('index', 2), ('remove', 2)]
+
+
+@pytest.mark.anyio
+async def test_writes_without_search_backend(get_test_session, monkeypatch):
+    monkeypatch.setattr('app.crud.post.DIALECT_SEARCH_BACKENDS', {})
+    user = await _create_posts(get_test_session)
+    await post_crud.update(get_test_session, 1, PostUpdate(content='Про карася.'), user=user)
+    await post_crud.delete(get_test_session, 2, user)
+    with pytest.raises(NotImplementedError):
+        await post_crud.search(get_test_session, 'щука')
+
+
+def test_search_endpoint():
+    client.post('/auth/register', json={'email': 'user@example.com', 'password': 'password'})
+    token = client.post('/auth/jwt/login', data={'username': 'user@example.com', 'password': 'password'}).json()['access_token']
+    for title, content in POSTS:
+        client.post('/post/', json={'title': title, 'content': content}, headers={'Authorization': f'Bearer {token}'})
+    response = client.get('/post/search', params={'q': 'щука', 'limit': 2})
+    assert response.status_code == 200
+    assert [post['id'] for post in response.json()] == [4, 2]
+    response = client.get('/post/search', params={'q': 'щука', 'limit': 2, 'cursor': response.headers['X-Next-Cursor']})
+    assert [post['id'] for post in response.json()] == [1]
+    assert 'X-Next-Cursor' not in response.headers
+    assert client.get('/post/search').status_code == 422
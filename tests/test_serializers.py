@@ -0,0 +1,35 @@
+from datetime import datetime as dt
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.schemas import PostResponse
+from app.serializers.post import dumps_post, dumps_posts, post_row
+
+from .conftest import Post, User
+
+AUTHOR = User(id=1, email='author@example.com', hashed_password='password',
+              is_active=True, is_superuser=False, is_verified=False)
+POSTS = (
+    Post(id=1, title='POST New post title.', content='POST New post content.',
+         created=dt(2023, 7, 3, 21, 2, 43, 540710), updated=None, likes=0, dislikes=0, author=AUTHOR),
+    Post(id=2, title='Заголовок "в кавычках" \\ 😀', content='Строка\nвторая\t\x01 ',
+         created=dt(2023, 7, 3), updated=dt(2023, 7, 4, 1, 2, 3, 4), likes=10**6, dislikes=3, author=AUTHOR),
+)
+
+
+def _expected(content) -> bytes:
+    """Serialization by FastAPI with `response_model_exclude_none=True`."""
+    return JSONResponse(jsonable_encoder(content, exclude_none=True)).body
+
+
+@pytest.mark.parametrize('post', POSTS)
+def test_dumps_post(post):
+    assert dumps_post(post_row(post)) == _expected(PostResponse.from_orm(post))
+
+
+def test_dumps_posts():
+    expected = _expected([PostResponse.from_orm(post) for post in POSTS])
+    assert dumps_posts(post_row(post) for post in POSTS) == expected
+    assert dumps_posts([]) == _expected([])
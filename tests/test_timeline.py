@@ -0,0 +1,199 @@
+import pytest
+
+from app.core import settings
+from app.core.timeline import MemoryTimelines, RedisTimelines
+from app.crud.follow import follow_crud
+from app.crud.post import post_crud
+
+from .conftest import PostCreate
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """Sorted sets are dicts of member: score."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, xx=False, keepttl=False):
+        if not xx or key in self.data:
+            self.data[key] = str(value).encode()
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def expire(self, key, seconds):
+        pass
+
+    def _sorted(self, key):
+        return sorted(((member.encode(), score) for member, score in self.data.get(key, {}).items()),
+                      key=lambda item: (item[1], item[0]))
+
+    async def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def zrem(self, key, member):
+        self.data.get(key, {}).pop(member, None)
+
+    async def zrange(self, key, start, stop, withscores):
+        return self._sorted(key)[start:None if stop == -1 else stop + 1]
+
+    async def zrangebyscore(self, key, min, max, start=0, num=-1, withscores=False):
+        def bound(value):
+            value = str(value)
+            return (float(value[1:]), True) if value.startswith('(') else (float(value), False)
+
+        (low, low_open), (high, high_open) = bound(min), bound(max)
+        items = [(member, score) for member, score in self._sorted(key)
+                 if (score > low if low_open else score >= low) and (score < high if high_open else score <= high)]
+        return items[start:None if num == -1 else start + num]
+
+    async def zremrangebyrank(self, key, start, stop):
+        removed = self._sorted(key)[start:None if stop == -1 else stop + 1]
+        for member, _ in removed:
+            del self.data[key][member.decode()]
+        return len(removed)
+
+
+@pytest.mark.parametrize('get_timelines', (lambda: MemoryTimelines(3, 10),
+                                           lambda: RedisTimelines(FakeRedis(), 3, ttl=60)))
+@pytest.mark.anyio
+async def test_timelines(get_timelines):
+    timelines = get_timelines()
+    assert await timelines.get(1, None, 10) is None
+    await timelines.set(1, [(1.5, 1), (2.5, 2)], False)
+    await timelines.push([1, 2], (3.5, 3))
+    assert await timelines.get(2, None, 10) is None
+    assert await timelines.get(1, None, 2) == ([(3.5, 3), (2.5, 2)], False)
+    assert await timelines.get(1, (2.5, 2), 10) == ([(1.5, 1)], False)
+    await timelines.push([1], (3.5, 4))
+    assert await timelines.get(1, (3.5, 3), 1) == ([(3.5, 4)], True)
+    await timelines.remove([1], 4)
+    assert await timelines.get(1, None, None) == ([(3.5, 3), (2.5, 2)], True)
+    await timelines.set(1, [], False)
+    assert await timelines.get(1, None, 10) == ([], False)
+    await timelines.delete(1)
+    assert await timelines.get(1, None, 10) is None
+
+
+@pytest.mark.anyio
+async def test_memory_timelines_evict_least_recently_read():
+    timelines = MemoryTimelines(max_length=10, max_users=2)
+    for user_id in (1, 2):
+        await timelines.set(user_id, [], False)
+    await timelines.get(1, None, 10)
+    await timelines.set(3, [], False)
+    assert len(timelines) == 2
+    assert await timelines.get(2, None, 10) is None
+
+
+async def _pages(read, session, user, limit: int = 3) -> list[int]:
+    ids, cursor = [], None
+    while True:
+        page = await read(session, user, limit=limit, cursor=cursor)
+        ids += [row.id for row in page]
+        cursor = post_crud.next_feed_cursor(page, limit)
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize('max_length', (100, 2))
+@pytest.mark.anyio
+async def test_timeline_feed(get_test_session, create_users, monkeypatch, max_length):
+    timelines = MemoryTimelines(max_length, max_users=10)
+    monkeypatch.setattr(post_crud, 'timelines', timelines)
+    monkeypatch.setattr(settings, 'timeline_celebrity_followers', 1)
+    session = get_test_session
+    reader, other, author, celebrity = await create_users(4)
+    for user in (reader, other):
+        await follow_crud.follow(session, celebrity.id, user)
+    await follow_crud.follow(session, author.id, reader)
+    assert (author.followers, celebrity.followers) == (1, 2)
+    assert await post_crud.get_timeline(session, reader) == []
+    posts = [await post_crud.create(session, PostCreate(title=f'Post {i}', content='Content.'),
+                                    user=(author, celebrity)[i % 2]) for i in range(6)]
+    keys, _ = await timelines.get(reader.id, None, None)
+    assert [pk for _, pk in keys] == [post.id for post in posts[-2::-2]][:max_length]
+    feed = await _pages(post_crud.get_feed, session, reader)
+    assert feed == [post.id for post in reversed(posts)]
+    assert await _pages(post_crud.get_timeline, session, reader) == feed
+    await post_crud.delete(session, posts[-2].id, author)
+    feed.remove(posts[-2].id)
+    assert await _pages(post_crud.get_timeline, session, reader) == feed
+    await follow_crud.unfollow(session, author.id, reader)
+    assert await timelines.get(reader.id, None, None) is None
+    assert await _pages(post_crud.get_timeline, session, reader) == [post.id for post in posts[::-2]]
+
+
+@pytest.mark.anyio
+async def test_celebrity_threshold_crossing_rebuilds_timelines(get_test_session, create_users, monkeypatch):
+    timelines = MemoryTimelines(100, max_users=10)
+    monkeypatch.setattr(post_crud, 'timelines', timelines)
+    monkeypatch.setattr(settings, 'timeline_celebrity_followers', 1)
+    session = get_test_session
+    reader, other, celebrity = await create_users(3)
+    for user in (reader, other):
+        await follow_crud.follow(session, celebrity.id, user)
+    post = await post_crud.create(session, PostCreate(title='Post', content='Content.'), user=celebrity)
+    assert [row.id for row in await post_crud.get_timeline(session, reader)] == [post.id]
+    assert await timelines.get(reader.id, None, None) == ([], False)
+    await follow_crud.unfollow(session, celebrity.id, other)
+    assert await timelines.get(reader.id, None, None) is None
+    assert [row.id for row in await post_crud.get_timeline(session, reader)] == [post.id]
+    assert [pk for _, pk in (await timelines.get(reader.id, None, None))[0]] == [post.id]
+    await follow_crud.follow(session, celebrity.id, other)
+    assert await timelines.get(reader.id, None, None) is None
+
+
+@pytest.mark.anyio
+async def test_timeline_feed_max_authors(get_test_session, create_users, monkeypatch):
+    timelines = MemoryTimelines(100, max_users=10)
+    monkeypatch.setattr(post_crud, 'timelines', timelines)
+    monkeypatch.setattr(settings, 'feed_max_authors', 1)
+    session = get_test_session
+    reader, first, second = await create_users(3)
+    for author in (first, second):
+        await follow_crud.follow(session, author.id, reader)
+    assert await post_crud.get_timeline(session, reader) == []
+    posts = [await post_crud.create(session, PostCreate(title=f'Post {i}', content='Content.'), user=author)
+             for i, author in enumerate((first, second))]
+    assert [pk for _, pk in (await timelines.get(reader.id, None, None))[0]] == [posts[1].id]
+    feed = [row.id for row in await post_crud.get_feed(session, reader)]
+    assert [row.id for row in await post_crud.get_timeline(session, reader)] == feed == [posts[1].id]
+
+
+@pytest.mark.anyio
+async def test_import_rebuilds_follower_timelines(get_test_session, create_users, monkeypatch):
+    timelines = MemoryTimelines(100, max_users=10)
+    monkeypatch.setattr(post_crud, 'timelines', timelines)
+    session = get_test_session
+    reader, author = await create_users(2)
+    await follow_crud.follow(session, author.id, reader)
+    assert await post_crud.get_timeline(session, reader) == []
+    await post_crud.bulk_create(session, [PostCreate(title='Imported', content='Content.')], user=author)
+    assert await timelines.get(reader.id, None, None) is None
+    assert [row.title for row in await post_crud.get_timeline(session, reader)] == ['Imported']
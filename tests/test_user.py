@@ -0,0 +1,145 @@
+from time import monotonic
+
+import pytest
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi_users import exceptions
+from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from sqlalchemy import func, inspect, select
+
+from app.core.password import CONTEXT, ExecutorPasswordHelper
+from app.core.user import CachedJWTStrategy, UserCache, UserManager, get_jwt_strategy, user_cache
+from app.schemas import UserCreate, UserUpdate
+
+from .conftest import TestingSessionLocal, User
+from .fixtures.endpoints_testlib import client
+
+
+async def _create_user(session) -> tuple[User, UserManager]:
+    user = User(email='user@example.com', hashed_password='password', is_active=True,
+                is_superuser=False, is_verified=False)
+    session.add(user)
+    await session.commit()
+    return user, UserManager(SQLAlchemyUserDatabase(session, User))
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError('The token must not be decoded.')
+
+
+@pytest.mark.anyio
+async def test_read_token_cached(get_test_session, statements, monkeypatch):
+    user, user_manager = await _create_user(get_test_session)
+    strategy = get_jwt_strategy()
+    assert isinstance(strategy, CachedJWTStrategy)
+    token = await strategy.write_token(user)
+    assert (await strategy.read_token(token, user_manager)).id == user.id
+    statements.clear()
+    monkeypatch.setattr('app.core.user.decode_jwt', _fail)
+    async with TestingSessionLocal() as session:
+        cached = await strategy.read_token(token, UserManager(SQLAlchemyUserDatabase(session, User)))
+        assert statements == []
+        assert cached is not user
+        assert (cached.id, cached.email, cached.is_active) == (user.id, user.email, True)
+        assert inspect(cached).persistent and cached in session
+
+
+@pytest.mark.anyio
+async def test_read_token_cached_user_updated_in_place(get_test_session):
+    user, user_manager = await _create_user(get_test_session)
+    strategy = get_jwt_strategy()
+    token = await strategy.write_token(user)
+    await strategy.read_token(token, user_manager)
+    async with TestingSessionLocal() as session:
+        user_db = SQLAlchemyUserDatabase(session, User)
+        cached = await strategy.read_token(token, UserManager(user_db))
+        await user_db.update(cached, {'is_verified': True})
+        assert await session.scalar(select(func.count()).select_from(User)) == 1
+        assert (await session.get(User, user.id)).is_verified is True
+
+
+@pytest.mark.anyio
+async def test_read_token_invalidated_in_other_workers(get_test_session):
+    """The workers share only the invalidations backend."""
+    user, user_manager = await _create_user(get_test_session)
+    other_cache = UserCache(10, 60, invalidations=user_cache.invalidations)
+    strategy = CachedJWTStrategy('secret', lifetime_seconds=60, cache=other_cache, ttl=60)
+    token = await strategy.write_token(user)
+    await strategy.read_token(token, user_manager)
+    assert await other_cache.get(token) is not None
+    await user_manager.update(UserUpdate(is_active=False), user)
+    assert await other_cache.get(token) is None
+    assert (await strategy.read_token(token, user_manager)).is_active is False
+
+
+@pytest.mark.anyio
+async def test_read_token_invalidated_on_update(get_test_session):
+    user, user_manager = await _create_user(get_test_session)
+    strategy = get_jwt_strategy()
+    token = await strategy.write_token(user)
+    await strategy.read_token(token, user_manager)
+    await user_manager.update(UserUpdate(is_active=False), user)
+    assert (await strategy.read_token(token, user_manager)).is_active is False
+
+
+@pytest.mark.anyio
+async def test_read_token_ttl_capped_by_exp(get_test_session):
+    user, user_manager = await _create_user(get_test_session)
+    strategy = CachedJWTStrategy('secret', lifetime_seconds=2, cache=user_cache, ttl=60)
+    token = await strategy.write_token(user)
+    await strategy.read_token(token, user_manager)
+    [(expires, _)] = user_cache._cache._data.values()
+    assert expires - monotonic() <= 2
+
+
+@pytest.mark.parametrize('token', (None, 'invalid'))
+@pytest.mark.anyio
+async def test_read_token_invalid(get_test_session, token):
+    _, user_manager = await _create_user(get_test_session)
+    assert await get_jwt_strategy().read_token(token, user_manager) is None
+    assert len(user_cache._cache) == 0
+
+
+def test_authenticated_requests(statements):
+    credentials = {'email': 'user@example.com', 'password': 'password'}
+    assert client.post('/auth/register', json=credentials).status_code == 201
+    token = client.post('/auth/jwt/login', data={
+        'username': credentials['email'], 'password': credentials['password']}).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    for _ in range(2):
+        statements.clear()
+        assert client.get('/post/my_posts/', headers=headers).status_code == 200
+    assert not [statement for statement in statements if 'FROM user' in statement]
+
+
+def _credentials(password: str) -> OAuth2PasswordRequestForm:
+    return OAuth2PasswordRequestForm(username='user@example.com', password=password, scope='')
+
+
+@pytest.mark.anyio
+async def test_user_manager_hashes_off_event_loop(get_test_session, monkeypatch):
+    def on_event_loop(*args, **kwargs):
+        raise AssertionError('bcrypt must not run on the event loop.')
+
+    user_manager = UserManager(SQLAlchemyUserDatabase(get_test_session, User))
+    monkeypatch.setattr(user_manager.password_helper, 'hash', on_event_loop)
+    monkeypatch.setattr(user_manager.password_helper, 'verify_and_update', on_event_loop)
+    user = await user_manager.create(UserCreate(email='user@example.com', password='password'))
+    assert CONTEXT.verify('password', user.hashed_password)
+    assert (await user_manager.authenticate(_credentials('password'))).id == user.id
+    assert await user_manager.authenticate(_credentials('wrong')) is None
+    user = await user_manager.update(UserUpdate(password='new password'), user)
+    assert await user_manager.authenticate(_credentials('password')) is None
+    assert (await user_manager.authenticate(_credentials('new password'))).id == user.id
+    assert await user_manager.authenticate(OAuth2PasswordRequestForm(
+        username='nobody@example.com', password='password', scope='')) is None
+    with pytest.raises(exceptions.UserAlreadyExists):
+        await user_manager.create(UserCreate(email='user@example.com', password='password'))
+
+
+@pytest.mark.parametrize('pool', ('thread', 'process'))
+@pytest.mark.anyio
+async def test_executor_password_helper(pool):
+    helper = ExecutorPasswordHelper(pool, workers=2)
+    hashed = await helper.hash_async('password')
+    assert await helper.verify_and_update_async('password', hashed) == (True, None)
+    assert await helper.verify_and_update_async('wrong', hashed) == (False, None)